@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from queue import Queue, Empty
+from concurrent.futures import Future
+
+from sqlalchemy import insert
+
+from database import SessionLocal, Attendance, Students, Lecture
+
+# -------------------- SETTINGS --------------------
+
+BATCH_WINDOW_MS = float(os.getenv("ATTENDANCE_BATCH_WINDOW_MS", "10"))
+MAX_BATCH_ROWS = int(os.getenv("ATTENDANCE_MAX_BATCH_ROWS", "1000"))
+# unknown ids are looked up again after this long, in case they were added
+# by another process
+MISS_TTL_SECONDS = 30
+# columns a repeated (student, lecture) mark overwrites; the first
+# timestamp is kept
+UPSERT_COLUMNS = ("is_verified", "confidence_score", "status")
+
+
+# -------------------- ID CACHE --------------------
+
+class IdCache:
+    """Known student ids (-> full name) and lecture ids, so attendance
+    writes don't need two lookups per row."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._students = {}
+        self._lectures = set()
+        self._misses = {}
+
+    def remember_student(self, student_id: int, full_name: str):
+        with self._lock:
+            self._students[student_id] = full_name
+            self._misses.pop(("student", student_id), None)
+
+    def remember_lecture(self, lecture_id: int):
+        with self._lock:
+            self._lectures.add(lecture_id)
+            self._misses.pop(("lecture", lecture_id), None)
+
+    def cached_student(self, student_id: int):
+        """(known, full_name); known is None when the DB must be asked."""
+        with self._lock:
+            if student_id in self._students:
+                return True, self._students[student_id]
+            if self._recent_miss(("student", student_id)):
+                return False, None
+        return None, None
+
+    def cached_lecture(self, lecture_id: int):
+        with self._lock:
+            if lecture_id in self._lectures:
+                return True
+            if self._recent_miss(("lecture", lecture_id)):
+                return False
+        return None
+
+    def _recent_miss(self, key):
+        missed_at = self._misses.get(key)
+        return missed_at is not None and time.monotonic() - missed_at < MISS_TTL_SECONDS
+
+    def load(self, student_ids, lecture_ids):
+        """Fetch the given ids from the database in two queries."""
+        db = self.session_factory()
+        try:
+            students = db.query(Students.student_id, Students.full_name).filter(
+                Students.student_id.in_(student_ids)).all() if student_ids else []
+            lectures = db.query(Lecture.id).filter(
+                Lecture.id.in_(lecture_ids)).all() if lecture_ids else []
+        finally:
+            db.close()
+
+        now = time.monotonic()
+        with self._lock:
+            for student_id, full_name in students:
+                self._students[student_id] = full_name
+            for (lecture_id,) in lectures:
+                self._lectures.add(lecture_id)
+            for student_id in set(student_ids) - {s for s, _ in students}:
+                self._misses[("student", student_id)] = now
+            for lecture_id in set(lecture_ids) - {l for (l,) in lectures}:
+                self._misses[("lecture", lecture_id)] = now
+
+    def missing(self, records):
+        """Student and lecture ids of records that aren't cached yet."""
+        students = {r["student_id"] for r in records
+                    if self.cached_student(r["student_id"])[0] is None}
+        lectures = {r["lecture_id"] for r in records
+                    if self.cached_lecture(r["lecture_id"]) is None}
+        return students, lectures
+
+    def check(self, records):
+        """Per-record error message (None when valid) and student name,
+        answered from memory. Call load() with missing() first."""
+        errors = []
+        names = []
+        for r in records:
+            known, name = self.cached_student(r["student_id"])
+            names.append(name)
+            if not known:
+                errors.append("Student not found")
+            elif not self.cached_lecture(r["lecture_id"]):
+                errors.append("Lecture not found")
+            else:
+                errors.append(None)
+        return errors, names
+
+
+# -------------------- WRITER --------------------
+
+class AttendanceWriter:
+    """Coalesces attendance writes from concurrent requests into batched
+    inserts. Each caller's future resolves once its rows are committed."""
+
+    def __init__(self, session_factory=SessionLocal,
+                 window_ms=BATCH_WINDOW_MS, max_rows=MAX_BATCH_ROWS):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="attendance-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, rows) -> Future:
+        """Queue a list of attendance row dicts; resolves to the row count."""
+        future = Future()
+        self.queue.put((rows, future))
+        self._ensure_running()
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.window
+
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _statement(self, dialect):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            return insert(Attendance)
+
+        stmt = dialect_insert(Attendance)
+        return stmt.on_conflict_do_update(
+            index_elements=["student_id", "lecture_id"],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+        )
+
+    def _insert(self, rows):
+        # a statement may not touch the same key twice; merge duplicates the
+        # way the upsert would: the first mark's timestamp, the last mark's
+        # UPSERT_COLUMNS
+        merged = {}
+        for row in rows:
+            key = (row["student_id"], row["lecture_id"])
+            if key in merged:
+                merged[key].update({column: row[column]
+                                    for column in UPSERT_COLUMNS if column in row})
+            else:
+                merged[key] = dict(row)
+        rows = list(merged.values())
+
+        db = self.session_factory()
+        try:
+            db.execute(self._statement(db.get_bind().dialect.name), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # a running future can't be cancelled under us any more; the
+            # rows of one already cancelled (the caller went away) are
+            # still written, there is just no one to tell
+            waiting = [future.set_running_or_notify_cancel()
+                       for _, future in batch]
+
+            try:
+                self._insert([row for rows, _ in batch for row in rows])
+            except Exception:
+                # one bad request must not fail everyone else's rows
+                for (rows, future), wait in zip(batch, waiting):
+                    try:
+                        self._insert(rows)
+                    except Exception as exc:
+                        if wait:
+                            future.set_exception(exc)
+                    else:
+                        if wait:
+                            future.set_result(len(rows))
+                continue
+
+            for (rows, future), wait in zip(batch, waiting):
+                if wait:
+                    future.set_result(len(rows))
+
+
+id_cache = IdCache()
+attendance_writer = AttendanceWriter()
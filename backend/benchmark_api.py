@@ -0,0 +1,376 @@
+"""Benchmark harness for the API and its hot paths.
+
+Seeds a database with synthetic faculty, students, lectures and attendance,
+drives /mark-attendance, /verify-fingerprint, /login and /dashboard with
+concurrent clients (in-process through ASGI, or against a running server)
+and times the CPU-bound building blocks on their own. Every command prints
+a JSON report, so runs can be diffed to spot regressions.
+
+    python benchmark_api.py seed --students 5000 --lectures 200 --attendance 200000
+    python benchmark_api.py load --duration 30 --mix mark=16,verify=4,login=4,dashboard=8
+    python benchmark_api.py load --url http://127.0.0.1:8000 -o load.json
+    python benchmark_api.py micro -o micro.json
+
+The database is BENCHMARK_DATABASE_URL (default sqlite:///./benchmark.db),
+never the application's own attendance.db, unless --database-url says so.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL", "sqlite:///./benchmark.db")
+FINGERPRINT_FOLDER = "fingerprint_data"
+PASSWORD = "benchmark-password"
+ROOMS = 10
+SEED = 7
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000.0
+    return {
+        "count": len(ms),
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p90": round(float(np.percentile(ms, 90)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def use_database(url):
+    # database.py reads DATABASE_URL at import
+    os.environ["DATABASE_URL"] = url
+
+
+def fingerprint_paths():
+    return sorted(os.path.join(FINGERPRINT_FOLDER, f)
+                  for f in os.listdir(FINGERPRINT_FOLDER) if f.endswith(".tif"))
+
+
+def faculty_email(i):
+    return f"bench{i}@example.com"
+
+
+# -------------------- SEED --------------------
+
+def seed(args):
+    use_database(args.database_url)
+    import bcrypt
+    from sqlalchemy import insert
+    from database import engine, Base, SessionLocal, Faculty, Students, Lecture, Attendance
+
+    if args.reset:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+
+    rng = random.Random(SEED)
+    prints = fingerprint_paths()
+    now = datetime.now()
+    timings = {}
+
+    def timed(name, fn):
+        started = time.perf_counter()
+        fn()
+        timings[name] = round(time.perf_counter() - started, 3)
+
+    # one hash for everyone, bcrypt would dominate the seed otherwise
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt()).decode()
+
+    db = SessionLocal()
+    try:
+        def chunks(table, rows, size=10000):
+            for start in range(0, len(rows), size):
+                db.execute(insert(table), rows[start:start + size])
+            db.commit()
+
+        timed("faculty", lambda: chunks(Faculty, [{
+            "full_name": f"Faculty {i}",
+            "faculty_id": f"BF{i:05d}",
+            "department": rng.choice(["CS", "IT", "EXTC", "MECH"]),
+            "email": faculty_email(i),
+            "hashed_password": hashed,
+        } for i in range(1, args.faculty + 1)]))
+
+        timed("students", lambda: chunks(Students, [{
+            "student_id": i,
+            "full_name": f"Student {i}",
+            "fingerprint_data": prints[i % len(prints)] if prints else None,
+        } for i in range(1, args.students + 1)]))
+
+        # history spread over the past weeks, plus one lecture running now
+        # in every room
+        def lecture(i):
+            if i <= ROOMS:
+                start = now - timedelta(minutes=30)
+            else:
+                start = now - timedelta(days=rng.randint(1, 60), hours=rng.randint(0, 8))
+            return {
+                "subject_name": f"Subject {i % 40}",
+                "room": f"R{(i - 1) % ROOMS + 1}",
+                "start_time": start,
+                "end_time": start + timedelta(hours=1),
+                "is_active": True,
+            }
+
+        timed("lectures", lambda: chunks(
+            Lecture, [lecture(i) for i in range(1, args.lectures + 1)]))
+
+        pairs = rng.sample(range(args.students * args.lectures),
+                           min(args.attendance, args.students * args.lectures))
+        timed("attendance", lambda: chunks(Attendance, [{
+            "student_id": pair % args.students + 1,
+            "lecture_id": pair // args.students + 1,
+            "is_verified": True,
+            "confidence_score": round(rng.random(), 3),
+            "status": rng.choice(["present", "present", "present", "absent"]),
+            "timestamp": datetime.utcnow() - timedelta(minutes=rng.randint(0, 86400)),
+        } for pair in pairs]))
+    finally:
+        db.close()
+
+    return {
+        "database_url": args.database_url,
+        "faculty": args.faculty,
+        "students": args.students,
+        "lectures": args.lectures,
+        "attendance": len(pairs),
+        "seconds": timings,
+    }
+
+
+# -------------------- LOAD --------------------
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, workers = part.partition("=")
+        mix[name.strip()] = int(workers or 1)
+    return mix
+
+
+class Scenarios:
+    """One request per call; ids are drawn from the seeded ranges."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(SEED)
+        self.prints = fingerprint_paths()
+        self._bytes = {}
+
+    def print_bytes(self, path):
+        data = self._bytes.get(path)
+        if data is None:
+            with open(path, "rb") as f:
+                data = self._bytes[path] = f.read()
+        return data
+
+    async def mark(self, client):
+        return await client.post("/mark-attendance", json={
+            "student_id": self.rng.randint(1, self.args.students),
+            "lecture_id": self.rng.randint(1, self.args.lectures),
+            "is_verified": True,
+            "confidence_score": round(self.rng.random(), 3),
+            "status": "present",
+        })
+
+    async def verify(self, client):
+        student_id = self.rng.randint(1, self.args.students)
+        # same print as enrolled half of the time, another one otherwise
+        path = self.prints[student_id % len(self.prints)]
+        if self.rng.random() < 0.5:
+            path = self.rng.choice(self.prints)
+        return await client.post(
+            "/verify-fingerprint",
+            data={"student_id": str(student_id)},
+            files={"file": (os.path.basename(path), self.print_bytes(path), "image/tiff")})
+
+    async def login(self, client):
+        return await client.post("/login", json={
+            "email": faculty_email(self.rng.randint(1, self.args.faculty)),
+            "password": PASSWORD,
+        })
+
+    async def dashboard(self, client):
+        return await client.get("/dashboard")
+
+
+async def drive(client, scenario, deadline, results):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await scenario(client)
+            status = response.status_code
+        except Exception as exc:
+            status = type(exc).__name__
+        results.append((time.perf_counter() - started, status))
+
+
+async def run_load(args):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        use_database(args.database_url)
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                   base_url="http://benchmark", timeout=60)
+
+    scenarios = Scenarios(args)
+    mix = parse_mix(args.mix)
+    results = {name: [] for name in mix}
+
+    async with client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            drive(client, getattr(scenarios, name), deadline, results[name])
+            for name, workers in mix.items() for _ in range(workers)
+        ])
+        wall = time.perf_counter() - started
+
+    report = {
+        "target": args.url or "in-process",
+        "duration_seconds": round(wall, 3),
+        "mix": mix,
+        "endpoints": {},
+    }
+    for name, samples in results.items():
+        statuses = {}
+        for _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = [seconds for seconds, status in samples
+              if isinstance(status, int) and status < 400]
+        report["endpoints"][name] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / wall, 2) if wall > 0 else None,
+            "errors": len(samples) - len(ok),
+            "statuses": statuses,
+            "latency_ms": summarize([seconds for seconds, _ in samples]),
+        }
+    return report
+
+
+# -------------------- MICRO --------------------
+
+def repeat(fn, rounds, warmup=3):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return summarize(times)
+
+
+def micro(args):
+    import fingerprint_preprocess
+    from face_gallery import FaceGallery, ENCODING_DIM
+
+    report = {}
+    prints = fingerprint_paths()
+    with open(prints[0], "rb") as f:
+        data = f.read()
+
+    report["fingerprint_decode"] = repeat(
+        lambda: fingerprint_preprocess.decode(data), args.rounds)
+    report["fingerprint_load_image_cached"] = repeat(
+        lambda: fingerprint_preprocess.load_image(data), args.rounds)
+
+    try:
+        import verify
+
+        started = time.perf_counter()
+        verify.load_models()
+        report["model_load_seconds"] = round(time.perf_counter() - started, 3)
+        report["model_runtime"] = verify.runtime
+
+        batch = fingerprint_preprocess.load_batch((prints * 32)[:32])
+        for size in (1, 8, 32):
+            report[f"inference_batch_{size}"] = repeat(
+                lambda: verify.embed_batch(batch[:size]), args.rounds)
+
+        embeddings = verify.embed_batch(batch)
+        report["similarities_32"] = repeat(
+            lambda: verify.similarities(embeddings, embeddings[::-1]), args.rounds)
+    except (ImportError, OSError, ValueError) as exc:
+        report["inference_skipped"] = str(exc)
+
+    # synthetic gallery the size of a campus: students x samples
+    rng = np.random.default_rng(SEED)
+    students, samples = args.gallery_students, 3
+    centers = rng.normal(size=(students, ENCODING_DIM)).astype(np.float32) * 0.3
+    encodings = np.repeat(centers, samples, axis=0) + rng.normal(
+        size=(students * samples, ENCODING_DIM)).astype(np.float32) * 0.05
+    names = [f"Student {i}" for i in range(students) for _ in range(samples)]
+    queries = centers[rng.integers(0, students, size=8)]
+
+    for mode in ("samples", "centroid", "shortlist"):
+        gallery = FaceGallery(encodings, names, mode=mode)
+        report[f"face_match_{mode}_8_faces"] = repeat(
+            lambda: gallery.match(queries), args.rounds)
+
+    return report
+
+
+# -------------------- CLI --------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def scale(command):
+        command.add_argument("--database-url", default=DATABASE_URL)
+        command.add_argument("--faculty", type=int, default=200)
+        command.add_argument("--students", type=int, default=2000)
+        command.add_argument("--lectures", type=int, default=100)
+        command.add_argument("-o", "--output", help="write the report here too")
+
+    seeding = commands.add_parser("seed", help="fill a database with synthetic data")
+    scale(seeding)
+    seeding.add_argument("--attendance", type=int, default=50000)
+    seeding.add_argument("--reset", action="store_true",
+                         help="drop and recreate every table first")
+
+    loading = commands.add_parser("load", help="concurrent requests against the API")
+    scale(loading)
+    loading.add_argument("--url", help="running server; in-process when omitted")
+    loading.add_argument("--duration", type=float, default=20)
+    loading.add_argument("--mix", default="mark=8,verify=2,login=2,dashboard=4",
+                         help="scenario=concurrent clients, comma separated")
+
+    benchmarks = commands.add_parser("micro", help="time the CPU-bound hot paths")
+    benchmarks.add_argument("--rounds", type=int, default=50)
+    benchmarks.add_argument("--gallery-students", type=int, default=2000)
+    benchmarks.add_argument("-o", "--output", help="write the report here too")
+
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        report = seed(args)
+    elif args.command == "load":
+        unknown = set(parse_mix(args.mix)) - {"mark", "verify", "login", "dashboard"}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        report = asyncio.run(run_load(args))
+    else:
+        report = micro(args)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Headless replay of recorded video through the camera pipeline.
+
+Runs detection, tracking, blink check and recognition as fast as possible
+over video files or image folders, without a webcam or a window, and
+prints a JSON report: per-stage timings, FPS, per-frame latency
+percentiles and the attendance decisions that would have been made.
+
+    python benchmark_camera.py recordings/entrance.mp4 recordings/frames/
+    python benchmark_camera.py clip.mp4 --workers 0 --detect-every 1 -o base.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import camera_service
+from camera_pipeline import CAMERA_WORKERS, DETECT_SCALE, FrameCapture, make_executor
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values) * 1000.0
+    return {
+        "count": len(ms),
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def replay(source, executor, detect_every, max_in_flight):
+    # keep every frame: a benchmark must see the whole recording
+    capture = FrameCapture(source, drop_stale=False)
+    if not capture.start():
+        raise SystemExit(f"Cannot open {source}")
+
+    latencies = []
+    stages = {}
+    decisions = []
+    frames = 0
+    keyframes = 0
+
+    try:
+        for frame, tracks, confirmed, timings in camera_service.process_source(
+                capture, executor, detect_every, max_in_flight):
+            latencies.append(time.perf_counter() - frame.captured_at)
+            frames += 1
+            if "detect" in timings:
+                keyframes += 1
+            for stage, seconds in timings.items():
+                stages.setdefault(stage, []).append(seconds)
+            for track in confirmed:
+                decisions.append({
+                    "source": str(source),
+                    "frame": frame.seq,
+                    "track": track.id,
+                    "name": track.name,
+                })
+    finally:
+        capture.stop()
+
+    return frames, keyframes, latencies, stages, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("sources", nargs="+",
+                        help="video files or folders of images")
+    parser.add_argument("--workers", type=int, default=CAMERA_WORKERS)
+    parser.add_argument("--detect-every", type=int,
+                        default=camera_service.DETECT_EVERY)
+    parser.add_argument("-o", "--output", help="write the report here too")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if not camera_service.load_models():
+        raise SystemExit(1)
+    load_seconds = time.perf_counter() - started
+
+    shm, gallery_spec = camera_service.gallery.share()
+    executor = make_executor(gallery_spec, workers=args.workers)
+    max_in_flight = max(args.workers, 1) * 2
+
+    latencies = []
+    stages = {}
+    decisions = []
+    frames = 0
+    keyframes = 0
+
+    started = time.perf_counter()
+    try:
+        for source in args.sources:
+            result = replay(source, executor, args.detect_every, max_in_flight)
+            frames += result[0]
+            keyframes += result[1]
+            latencies += result[2]
+            for stage, values in result[3].items():
+                stages.setdefault(stage, []).extend(values)
+            decisions += result[4]
+    finally:
+        executor.shutdown(wait=True)
+        shm.close()
+        shm.unlink()
+    wall = time.perf_counter() - started
+
+    report = {
+        "settings": {
+            "workers": args.workers,
+            "detect_every": args.detect_every,
+            "detect_scale": DETECT_SCALE,
+            "match_mode": camera_service.MATCH_MODE,
+            "gallery_samples": len(camera_service.gallery),
+        },
+        "load_seconds": round(load_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "frames": frames,
+        "keyframes": keyframes,
+        "fps": round(frames / wall, 2) if wall > 0 else None,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values)
+                      for stage, values in stages.items()},
+        "decisions": decisions,
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+import json
+import struct
+
+import numpy as np
+
+# -------------------- FORMAT --------------------
+# a template is a fixed header followed by the raw vector:
+#
+#   magic "BTPL" | format version u8 | dtype u8 | dim u16 | model id 16s
+#
+# 24 bytes, so the vector that follows stays 8-byte aligned. The model id
+# is also a column, for filtering; the copy in the header keeps a blob
+# self-describing wherever it ends up.
+
+MAGIC = b"BTPL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBBH16s")
+
+DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+FACE = "face"
+FINGERPRINT = "fingerprint"
+
+# bump when a model change makes stored vectors incomparable with new ones
+FACE_MODEL_ID = os.getenv("FACE_MODEL_ID", "dlib-resnet-v1")
+FINGERPRINT_MODEL_ID = os.getenv("FINGERPRINT_MODEL_ID", "siamese-v1")
+
+# float16 halves the storage again; 128-d face and fingerprint vectors
+# lose well under 1e-3 in distance
+TEMPLATE_DTYPE = np.dtype(os.getenv("TEMPLATE_DTYPE", "float32")).newbyteorder("<")
+
+
+def encode_template(vector, model_id: str, dtype=TEMPLATE_DTYPE) -> bytes:
+    vector = np.asarray(vector).ravel().astype(dtype)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, DTYPE_CODES[np.dtype(dtype)],
+                         vector.size, model_id.encode()[:16])
+    return header + vector.tobytes()
+
+
+def _check_header(header, model_id=None):
+    magic, version, dtype_code, dim, stored_model = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION or dtype_code not in DTYPES:
+        raise ValueError("Not a biometric template")
+    stored_model = stored_model.rstrip(b"\0").decode()
+    if model_id is not None and stored_model != model_id[:16]:
+        raise ValueError(f"Template is for model {stored_model}, not {model_id}")
+    return DTYPES[dtype_code], dim
+
+
+def decode_template(blob: bytes, model_id: str = None) -> np.ndarray:
+    """float32 vector of one template."""
+    dtype, dim = _check_header(blob[:HEADER.size], model_id)
+    return np.frombuffer(blob, dtype=dtype, count=dim,
+                         offset=HEADER.size).astype(np.float32)
+
+
+def decode_templates(blobs, model_id: str = None, dim: int = 0) -> np.ndarray:
+    """(n, dim) float32 matrix of many templates. When every blob shares
+    one header (the normal case: one model, one dtype) they are decoded
+    with a single frombuffer over the joined bytes."""
+    if not blobs:
+        return np.empty((0, dim), dtype=np.float32)
+
+    first = blobs[0][:HEADER.size]
+    dtype, dim = _check_header(first, model_id)
+    size = HEADER.size + dim * dtype.itemsize
+
+    if all(len(blob) == size and blob[:HEADER.size] == first for blob in blobs):
+        rows = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), size)
+        return rows[:, HEADER.size:].copy().view(dtype).astype(np.float32)
+
+    return np.stack([decode_template(blob, model_id) for blob in blobs])
+
+
+def parse_encoding(text, dim=128) -> np.ndarray:
+    """Legacy text encodings (Students.face_encoding): a JSON list or
+    comma/space separated floats."""
+    try:
+        values = json.loads(text)
+    except ValueError:
+        values = text.strip("[]").replace(",", " ").split()
+
+    try:
+        encoding = np.asarray(values, dtype=np.float32).ravel()
+    except (TypeError, ValueError):
+        # a JSON object, null or anything else that isn't a list of numbers
+        raise ValueError("Face encoding is not a list of numbers")
+    if encoding.shape != (dim,):
+        raise ValueError(f"Expected {dim} values, got {encoding.size}")
+    return encoding
+
+
+# -------------------- BULK LOAD --------------------
+
+def load_templates(conn, modality: str, model_id: str, dim: int = 0):
+    """(student_ids, full_names, sources, matrix) of every sample of one
+    modality and model, in a single query. Works on any SQLAlchemy
+    connection or session, so the camera process can use it without the
+    API's models."""
+    from sqlalchemy import text
+
+    rows = conn.execute(text(
+        "SELECT t.student_id, s.full_name, t.source, t.template "
+        "FROM biometric_templates t "
+        "JOIN students s ON s.student_id = t.student_id "
+        "WHERE t.modality = :modality AND t.model_id = :model_id "
+        "ORDER BY t.student_id, t.id"
+    ), {"modality": modality, "model_id": model_id}).all()
+
+    student_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    names = [row[1] for row in rows]
+    sources = [row[2] for row in rows]
+    matrix = decode_templates([bytes(row[3]) for row in rows], model_id, dim)
+    return student_ids, names, sources, matrix
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from queue import Empty
+
+from database import SessionLocal, Students, Lecture
+from attendance_writer import attendance_writer
+from structured_logging import get_logger
+
+logger = get_logger("camera_attendance")
+
+# -------------------- SETTINGS --------------------
+
+BATCH_WINDOW_MS = float(os.getenv("CAMERA_ATTENDANCE_WINDOW_MS", "200"))
+MAX_BATCH = int(os.getenv("CAMERA_ATTENDANCE_MAX_BATCH", "500"))
+# recognitions that could not be written are kept, up to this many, and
+# retried with exponential backoff
+MAX_PENDING = int(os.getenv("CAMERA_ATTENDANCE_MAX_PENDING", "10000"))
+RETRY_MIN_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+# camera labels are folder names under "Students Faces" (or "<student_id>
+# <full name>" for faces stored in the database). A label is resolved to
+# a student by, in order: its entry in LABELS_FILE ({"label": student_id}),
+# a leading student id ("12" or "12 Om Singh"), or an exact full name.
+LABELS_FILE = os.getenv("CAMERA_LABELS_FILE",
+                        os.path.join("Students Faces", "students.json"))
+STUDENT_ID_LABEL = re.compile(r"^(\d+)(?:[ _-]|$)")
+
+
+def load_label_map(path=LABELS_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return {str(label): int(student_id)
+                for label, student_id in json.load(f).items()}
+
+
+# -------------------- RECORDER --------------------
+
+class CameraAttendance:
+    """Turns camera recognitions into Attendance rows.
+
+    The camera process puts (name, room, seen_at, confidence) tuples on a
+    multiprocessing queue; this thread, in the backend process, drains it
+    in batches, resolves the student from the label (see LABELS_FILE) and
+    the lecture running in that room at seen_at, and upserts through the attendance writer.
+    Each (student, lecture) pair is written once."""
+
+    def __init__(self, session_factory=SessionLocal, writer=attendance_writer,
+                 window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH,
+                 max_pending=MAX_PENDING, labels_file=LABELS_FILE):
+        self.session_factory = session_factory
+        self.labels_file = labels_file
+        self.label_map = {}
+        self.writer = writer
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.pending = deque(maxlen=max_pending)
+        self.source = None
+        # (student_id, lecture_id) -> lecture end, forgotten once it is over
+        self.marked = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, source):
+        """Drain `source` from now on; called whenever the camera process
+        is (re)started with a new queue."""
+        self.label_map = load_label_map(self.labels_file)
+        self.source = source
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="camera-attendance", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self.pending.popleft()
+                 for _ in range(min(len(self.pending), self.max_batch))]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch:
+            source = self.source
+            remaining = deadline - time.monotonic()
+            if source is None or remaining <= 0:
+                break
+            try:
+                batch.append(source.get(timeout=remaining))
+            except Empty:
+                break
+            except (OSError, ValueError):
+                # the queue of a stopped camera process was closed under us
+                time.sleep(remaining)
+                break
+        return batch
+
+    def resolve_students(self, db, labels):
+        """label -> student_id for the labels that name an existing
+        student."""
+        by_id = {}
+        by_name = set()
+        for label in labels:
+            match = STUDENT_ID_LABEL.match(label)
+            if label in self.label_map:
+                by_id[label] = self.label_map[label]
+            elif match:
+                by_id[label] = int(match.group(1))
+            else:
+                by_name.add(label)
+
+        existing = {student_id for (student_id,) in db.query(Students.student_id)
+                    .filter(Students.student_id.in_(set(by_id.values())))}
+        students = {label: student_id for label, student_id in by_id.items()
+                    if student_id in existing}
+        if by_name:
+            students.update(db.query(Students.full_name, Students.student_id)
+                            .filter(Students.full_name.in_(by_name)).all())
+        return students
+
+    def check_labels(self, labels):
+        """Labels the camera can recognize that resolve to no student;
+        their recognitions would be dropped, so they are logged as
+        errors."""
+        db = self.session_factory()
+        try:
+            students = self.resolve_students(db, labels)
+        finally:
+            db.close()
+
+        unresolved = sorted(set(labels) - set(students))
+        if unresolved:
+            logger.error("camera labels match no student, their recognitions "
+                         "will be dropped", extra={
+                             "labels": unresolved, "labels_file": self.labels_file})
+        return unresolved
+
+    def _resolve(self, db, batch):
+        names = {name for name, _, _, _ in batch}
+        rooms = {room for _, room, _, _ in batch}
+        first = min(seen_at for _, _, seen_at, _ in batch)
+        last = max(seen_at for _, _, seen_at, _ in batch)
+
+        students = self.resolve_students(db, names)
+        lectures = (db.query(Lecture.id, Lecture.room,
+                             Lecture.start_time, Lecture.end_time)
+                    .filter(Lecture.room.in_(rooms),
+                            Lecture.is_active == True,
+                            Lecture.start_time <= last,
+                            Lecture.end_time >= first)
+                    .all())
+        return students, lectures
+
+    def _rows(self, batch, students, lectures):
+        rows = []
+        marked = {}
+        for name, room, seen_at, confidence in batch:
+            student_id = students.get(name)
+            if student_id is None:
+                logger.warning("unknown student recognized",
+                               extra={"student": name, "room": room})
+                continue
+
+            lecture = next((l for l in lectures if l.room == room
+                            and l.start_time <= seen_at <= l.end_time), None)
+            if lecture is None:
+                logger.info("no lecture running",
+                            extra={"student": name, "room": room})
+                continue
+
+            key = (student_id, lecture.id)
+            if key in self.marked or key in marked:
+                continue
+            marked[key] = lecture.end_time
+
+            rows.append({
+                "student_id": student_id,
+                "lecture_id": lecture.id,
+                "is_verified": True,
+                "confidence_score": confidence,
+                "status": "present",
+                # when the face was seen, not when the batch got written
+                "timestamp": seen_at,
+            })
+        return rows, marked
+
+    def _record(self, batch):
+        db = self.session_factory()
+        try:
+            students, lectures = self._resolve(db, batch)
+        finally:
+            db.close()
+
+        rows, marked = self._rows(batch, students, lectures)
+        if rows:
+            self.writer.submit(rows).result()
+        self.marked.update(marked)
+        for student_id, lecture_id in marked:
+            logger.info("attendance marked", extra={
+                "student_id": student_id, "lecture_id": lecture_id})
+
+    def _forget_finished(self):
+        # lecture times are stored in UTC, like seen_at
+        cutoff = datetime.utcnow() - timedelta(minutes=5)
+        for key, end_time in list(self.marked.items()):
+            if end_time < cutoff:
+                del self.marked[key]
+
+    def _run(self):
+        delay = RETRY_MIN_SECONDS
+        while True:
+            batch = self._collect()
+            if not batch:
+                if self.source is None:
+                    time.sleep(self.window)
+                continue
+
+            try:
+                self._record(batch)
+            except Exception as exc:
+                logger.warning("camera attendance write failed", extra={
+                    "retry_in": delay, "pending": len(self.pending), "error": str(exc)})
+                self.pending.extendleft(reversed(batch))
+                time.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_SECONDS)
+                continue
+
+            delay = RETRY_MIN_SECONDS
+            self._forget_finished()
+
+
+camera_attendance = CameraAttendance()
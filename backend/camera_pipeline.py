@@ -0,0 +1,250 @@
+import os
+import time
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from queue import Queue, Full, Empty
+
+import cv2
+import numpy as np
+
+from face_gallery import FaceGallery
+
+# ===================== SETTINGS =====================
+CAMERA_WORKERS = int(os.getenv(
+    "CAMERA_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+FRAME_QUEUE_SIZE = int(os.getenv("CAMERA_FRAME_QUEUE", "2"))
+# faces are detected on a downscaled grayscale frame, then the boxes are
+# scaled back up for the encodings
+DETECT_SCALE = float(os.getenv("CAMERA_DETECT_SCALE", "0.5"))
+
+Frame = namedtuple("Frame", ["seq", "captured_at", "image"])
+Analysis = namedtuple(
+    "Analysis", ["boxes", "encodings", "matches", "timings"])
+
+# ===================== CAPTURE =====================
+
+
+class ImageFolderReader:
+    """cv2.VideoCapture-like reader over the images of a folder, in name
+    order, for replaying recorded image sequences."""
+
+    IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, folder):
+        self.paths = [
+            os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if name.lower().endswith(self.IMAGE_EXTS)
+        ]
+        self._next = 0
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        while self._next < len(self.paths):
+            image = cv2.imread(self.paths[self._next])
+            self._next += 1
+            if image is not None:
+                return True, image
+        return False, None
+
+    def release(self):
+        self._next = len(self.paths)
+
+
+class FrameCapture:
+    """Reads a video source on its own thread into a small bounded queue.
+
+    With drop_stale the oldest queued frame is thrown away when the queue
+    is full, so downstream stages always work on the most recent frame
+    instead of falling further and further behind."""
+
+    END = object()
+
+    def __init__(self, source=0, queue_size=FRAME_QUEUE_SIZE, drop_stale=True):
+        self.source = source
+        self.drop_stale = drop_stale
+        self.queue = Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._cap = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if isinstance(self.source, str) and os.path.isdir(self.source):
+            self._cap = ImageFolderReader(self.source)
+        else:
+            self._cap = cv2.VideoCapture(self.source)
+        if not self._cap.isOpened():
+            return False
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"capture-{self.source}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except Full:
+                if not self.drop_stale or item is self.END:
+                    continue
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def _run(self):
+        seq = 0
+        while not self._stop.is_set():
+            ret, image = self._cap.read()
+            if not ret:
+                break
+            self._put(Frame(seq, time.perf_counter(), image))
+            seq += 1
+
+        self._cap.release()
+        self._put(self.END)
+
+    def read(self, block=True):
+        """Next frame, None if nothing is queued (non-blocking) or END once
+        the source is exhausted."""
+        try:
+            return self.queue.get(block=block)
+        except Empty:
+            return None
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+# ===================== ANALYSIS WORKER =====================
+# every pool process loads its own dlib models once, in init_worker(), and
+# attaches to the gallery the camera service published in shared memory
+
+
+_detector = None
+_face_recognition = None
+_gallery = None
+
+
+def init_worker(gallery_spec=None):
+    global _detector, _face_recognition, _gallery
+
+    import dlib
+    import face_recognition
+
+    _detector = dlib.get_frontal_face_detector()
+    _face_recognition = face_recognition
+    if gallery_spec is not None:
+        _gallery = FaceGallery.attach(gallery_spec)
+
+
+def analyze_frame(image, detect_scale=DETECT_SCALE):
+    """Detect faces, encode them and match the encodings against the
+    shared gallery. Eye landmarks for the blink check are left to the
+    source's liveness engine, which only looks at candidate matches."""
+    timings = {}
+
+    t = time.perf_counter()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = gray if detect_scale == 1 else cv2.resize(
+        gray, (0, 0), fx=detect_scale, fy=detect_scale)
+    rects = _detector(small, 0)
+
+    # (top, right, bottom, left) in full-resolution pixels
+    boxes = [
+        (int(r.top() / detect_scale), int(r.right() / detect_scale),
+         int(r.bottom() / detect_scale), int(r.left() / detect_scale))
+        for r in rects
+    ]
+    timings["detect"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    encodings = _face_recognition.face_encodings(rgb, boxes)
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    timings["encode"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    matches = _gallery.match(encodings) if _gallery is not None else []
+    timings["match"] = time.perf_counter() - t
+
+    return Analysis(boxes, encodings, matches, timings)
+
+# ===================== EXECUTORS =====================
+
+
+class InlineExecutor:
+    """Runs work on the calling thread; used when CAMERA_WORKERS=0."""
+
+    def __init__(self, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def make_executor(gallery_spec=None, workers=CAMERA_WORKERS):
+    initargs = (gallery_spec,)
+    if workers <= 0:
+        return InlineExecutor(init_worker, initargs)
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=initargs)
+
+# ===================== PIPELINE =====================
+
+
+class FramePipeline:
+    """Keeps up to max_in_flight frames in the worker pool and yields
+    (frame, analysis) pairs in capture order.
+
+    keyframe(frame) decides which frames get a full analysis; the others
+    are yielded with analysis None so the caller can track them cheaply."""
+
+    def __init__(self, capture, executor, max_in_flight=None,
+                 detect_scale=DETECT_SCALE, keyframe=None):
+        self.capture = capture
+        self.executor = executor
+        self.detect_scale = detect_scale
+        self.keyframe = keyframe
+        self.max_in_flight = max_in_flight or max(CAMERA_WORKERS, 1) * 2
+
+    def __iter__(self):
+        in_flight = deque()
+        exhausted = False
+
+        while in_flight or not exhausted:
+            # keep the pool busy, but only block for a frame when there is
+            # nothing else to wait on
+            while not exhausted and len(in_flight) < self.max_in_flight:
+                frame = self.capture.read(block=not in_flight)
+                if frame is None:
+                    break
+                if frame is FrameCapture.END:
+                    exhausted = True
+                    break
+
+                future = None
+                if self.keyframe is None or self.keyframe(frame):
+                    future = self.executor.submit(
+                        analyze_frame, frame.image, self.detect_scale)
+                in_flight.append((frame, future))
+
+            if in_flight:
+                frame, future = in_flight.popleft()
+                yield frame, future.result() if future is not None else None
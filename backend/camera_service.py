@@ -1,212 +1,470 @@
 import cv2
 import os
 import sys
+import json
+import time
+import queue
+import threading
 import numpy as np
 from datetime import datetime
 import multiprocessing
 
-import face_recognition
-import dlib
-from scipy.spatial import distance as dist
-from imutils import face_utils
+from face_gallery import FaceGallery
+from camera_pipeline import FrameCapture, FramePipeline, make_executor
+from face_tracker import FaceTracker
+from liveness import LivenessEngine
+from structured_logging import setup_logging, get_logger
 
-print("📷 Camera Service Python:", sys.executable)
+# the controller half of this module runs in the API process and logs;
+# print() is kept to the camera process itself
+logger = get_logger("camera")
 
 # ===================== SETTINGS =====================
+# one folder of photos per student. The folder name is the label the
+# camera reports; it must resolve to a student (see camera_attendance):
+# name the folder "<student_id>" / "<student_id> <name>", map it in
+# "Students Faces/students.json", or use the student's exact full name
 STUDENTS_FOLDER = "Students Faces"
+# "folder", "db" or "both"
+FACE_SOURCE = os.getenv("FACE_SOURCE", "folder")
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./attendance.db")
 THRESHOLD = 0.55
+MATCH_MODE = os.getenv("FACE_MATCH_MODE", "samples")
+SHORTLIST_K = int(os.getenv("FACE_SHORTLIST_K", "8"))
 REQUIRED_FRAMES = 3
+# full detection + encoding every N frames, correlation tracking between
+DETECT_EVERY = int(os.getenv("CAMERA_DETECT_EVERY", "5"))
+
+# source id -> cv2.VideoCapture argument (device index, RTSP URL or video
+# file), or {"source": ..., "room": ...}, as JSON in CAMERA_SOURCES or in
+# cameras.json. The room is matched against Lecture.room when attendance
+# is recorded and defaults to the source id.
+SOURCES_FILE = "cameras.json"
+SHOW_WINDOWS = os.getenv("CAMERA_SHOW_WINDOWS", "1") == "1"
+# how often each source reports its FPS and stage timings to the backend
+STATS_EVERY_SECONDS = float(os.getenv("CAMERA_STATS_SECONDS", "5"))
 
 PREDICTOR_PATH = "shape_predictor_68_face_landmarks.dat"
-EYE_AR_THRESH = 0.20
-EYE_AR_CONSEC_FRAMES = 1
 
-# ===================== ATTENDANCE FILE =====================
+# ===================== SOURCES =====================
 
 
-def get_today_file():
-    today = datetime.now().strftime("%Y-%m-%d")
-    return f"attendance_{today}.csv"
+def load_sources():
+    raw = os.getenv("CAMERA_SOURCES")
+    if raw is None and os.path.exists(SOURCES_FILE):
+        with open(SOURCES_FILE, "r") as f:
+            raw = f.read()
 
+    sources = json.loads(raw) if raw else {"default": 0}
 
-ATTENDANCE_FILE = get_today_file()
+    config = {}
+    for source_id, source in sources.items():
+        if not isinstance(source, dict):
+            source = {"source": source}
+        config[str(source_id)] = {
+            "source": source["source"],
+            "room": str(source.get("room", source_id)),
+        }
+    return config
 
-# ===================== LOAD MARKED STUDENTS =====================
 
-
-def load_marked_students(file_path):
-    marked = set()
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            lines = f.readlines()[1:]
-            for line in lines:
-                marked.add(line.split(",")[0])
-    return marked
-
-
-marked_students = load_marked_students(ATTENDANCE_FILE)
-
-# ===================== BLINK HELPERS =====================
-
-
-def eye_aspect_ratio(eye):
-    A = dist.euclidean(eye[1], eye[5])
-    B = dist.euclidean(eye[2], eye[4])
-    C = dist.euclidean(eye[0], eye[3])
-    return (A + B) / (2.0 * C)
-
-# ===================== CHECK FILES =====================
-
-
-if not os.path.exists(PREDICTOR_PATH):
-    print("❌ shape_predictor_68_face_landmarks.dat missing")
-    sys.exit(1)
-
-if not os.path.exists(STUDENTS_FOLDER):
-    print("❌ Students Faces folder missing")
-    sys.exit(1)
+CAMERA_SOURCES = load_sources()
 
 # ===================== LOAD MODELS =====================
+# the student gallery is loaded by load_models() inside the camera process
+# and the dlib models by each pipeline worker, so importing this module
+# from main.py stays cheap
 
-detector = dlib.get_frontal_face_detector()
-predictor = dlib.shape_predictor(PREDICTOR_PATH)
+gallery = None
 
-(lStart, lEnd) = face_utils.FACIAL_LANDMARKS_IDXS["left_eye"]
-(rStart, rEnd) = face_utils.FACIAL_LANDMARKS_IDXS["right_eye"]
 
-# ===================== LOAD STUDENTS =====================
+def load_models():
+    global gallery
 
-known_encodings = []
-known_names = []
-
-print("📌 Loading student faces...")
-
-for student in os.listdir(STUDENTS_FOLDER):
-    folder = os.path.join(STUDENTS_FOLDER, student)
-    if not os.path.isdir(folder):
-        continue
-
-    for img in os.listdir(folder):
-        if img.lower().endswith((".jpg", ".png", ".jpeg")):
-            path = os.path.join(folder, img)
-            image = face_recognition.load_image_file(path)
-            encs = face_recognition.face_encodings(image)
-            if encs:
-                known_encodings.append(encs[0])
-                known_names.append(student)
-                print(f"✅ Loaded {student}/{img}")
-
-print(f"✅ Total samples loaded: {len(known_encodings)}")
-
-# ===================== ATTENDANCE =====================
+    if gallery is not None:
+        return True
 
+    if not os.path.exists(PREDICTOR_PATH):
+        print("❌ shape_predictor_68_face_landmarks.dat missing")
+        return False
 
-def mark_attendance(name):
-    if name in marked_students:
-        print(f"🟡 {name} already marked")
+    if FACE_SOURCE != "db" and not os.path.exists(STUDENTS_FOLDER):
+        print("❌ Students Faces folder missing")
         return False
 
-    marked_students.add(name)
-    now = datetime.now()
+    from face_cache import load_folder_encodings, load_db_encodings
 
-    new_file = not os.path.exists(ATTENDANCE_FILE)
-    with open(ATTENDANCE_FILE, "a") as f:
-        if new_file:
-            f.write("Name,Date,Time\n")
-        f.write(f"{name},{now.date()},{now.time().strftime('%H:%M:%S')}\n")
+    known_encodings = np.empty((0, 128), dtype=np.float32)
+    known_names = []
 
-    print(f"🟢 Attendance marked: {name}")
-    return True
+    print("📌 Loading student faces...")
 
-# ===================== CAMERA WORKER =====================
+    if FACE_SOURCE in ("folder", "both"):
+        known_encodings, known_names = load_folder_encodings(STUDENTS_FOLDER)
 
+    if FACE_SOURCE in ("db", "both"):
+        db_encodings, db_names = load_db_encodings(DATABASE_URL)
+        known_encodings = np.concatenate([known_encodings, db_encodings])
+        known_names = known_names + db_names
 
-def run_camera():
-    cap = cv2.VideoCapture(0)
+    gallery = FaceGallery(known_encodings, known_names,
+                          mode=MATCH_MODE, shortlist_k=SHORTLIST_K)
 
-    if not cap.isOpened():
-        print("❌ Camera not accessible")
-        return
+    print(f"✅ Total samples loaded: {len(gallery)}")
+    return True
 
-    match_counter = {}
-    blink_count = 0
-    closed_frames = 0
+# ===================== ATTENDANCE =====================
 
-    print("🎥 Camera started")
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+# confirmed faces go to the backend process over the recognitions queue,
+# which writes them to the attendance table against the lecture running in
+# the camera's room (see camera_attendance.py)
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        rects = detector(gray, 0)
 
-        for rect in rects:
-            shape = predictor(gray, rect)
-            shape = face_utils.shape_to_np(shape)
+def mark_attendance(recognitions, track, room):
+    # seen_at is naive UTC, like every time the backend stores
+    confidence = round(max(0.0, 1.0 - float(track.match[1])), 4)
+    recognitions.put((track.name, room, datetime.utcnow(), confidence))
+    print(f"📤 {track.name} recognized in {room}")
 
-            leftEye = shape[lStart:lEnd]
-            rightEye = shape[rStart:rEnd]
-            ear = (eye_aspect_ratio(leftEye) +
-                   eye_aspect_ratio(rightEye)) / 2.0
+# ===================== TRACK STATE =====================
 
-            if ear < EYE_AR_THRESH:
-                closed_frames += 1
-            else:
-                if closed_frames >= EYE_AR_CONSEC_FRAMES:
-                    blink_count += 1
-                closed_frames = 0
 
-        small = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
-
-        locs = face_recognition.face_locations(rgb)
-        encs = face_recognition.face_encodings(rgb, locs)
+def update_match(track):
+    name, distance = track.match
+    if distance >= THRESHOLD:
+        return
 
-        for enc in encs:
-            dists = face_recognition.face_distance(known_encodings, enc)
-            idx = np.argmin(dists)
+    if name != track.name:
+        track.name = name
+        track.matches = 0
+    track.matches += 1
+
+# ===================== SOURCE WORKER =====================
+
+
+def process_source(capture, executor, detect_every=DETECT_EVERY,
+                   max_in_flight=None):
+    """Run the detect/track/blink/recognize pipeline over one capture.
+
+    Yields (frame, tracks, confirmed, timings) per frame, where confirmed
+    are the tracks that passed recognition and the blink check on this
+    frame and timings holds the per-stage seconds."""
+    tracker = FaceTracker()
+    liveness = LivenessEngine(PREDICTOR_PATH)
+
+    def keyframe(frame):
+        # detect every frame while nobody is tracked, so new faces are
+        # picked up straight away
+        return (frame.seq % detect_every == 0 or not tracker.tracks
+                or tracker.lost)
+
+    pipeline = FramePipeline(capture, executor, keyframe=keyframe,
+                             max_in_flight=max_in_flight)
+
+    for frame, analysis in pipeline:
+        t = time.perf_counter()
+
+        gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+        if analysis is not None:
+            tracks = tracker.on_detections(gray, analysis)
+        else:
+            tracks = tracker.on_frame(gray)
+
+        for track in tracks:
+            if track.match is not None:
+                update_match(track)
+        track_seconds = time.perf_counter() - t
+
+        # blink check only for faces that already match someone
+        t = time.perf_counter()
+        liveness.update(gray, tracks)
+
+        confirmed = []
+        for track in tracks:
+            if (track.name and not track.marked
+                    and track.matches >= REQUIRED_FRAMES
+                    and liveness.is_live(track)):
+                track.marked = True
+                confirmed.append(track)
+
+        timings = dict(analysis.timings) if analysis is not None else {}
+        timings["track"] = track_seconds
+        timings["liveness"] = time.perf_counter() - t
+        yield frame, tracks, confirmed, timings
+
+
+class SourceStats:
+    """Running totals of one source, sent to the backend as ("stats",
+    source_id, snapshot) events for /metrics."""
+
+    def __init__(self):
+        self.frames = 0
+        self.keyframes = 0
+        self.latency = [0, 0.0]
+        self.stages = {}
+        self._window_frames = 0
+        self._window_started = time.monotonic()
+        self.fps = 0.0
+
+    def add(self, frame, timings):
+        self.frames += 1
+        self._window_frames += 1
+        if "detect" in timings:
+            self.keyframes += 1
+        self.latency[0] += 1
+        self.latency[1] += time.perf_counter() - frame.captured_at
+        for stage, seconds in timings.items():
+            totals = self.stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def due(self):
+        return time.monotonic() - self._window_started >= STATS_EVERY_SECONDS
+
+    def snapshot(self, dropped):
+        now = time.monotonic()
+        self.fps = self._window_frames / max(now - self._window_started, 1e-9)
+        self._window_frames = 0
+        self._window_started = now
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "dropped": dropped,
+            "latency": list(self.latency),
+            "stages": {stage: list(totals) for stage, totals in self.stages.items()},
+        }
+
+
+def run_source(source_id, config, executor, stop, frames, recognitions, events):
+    """Capture, track and recognize one video source. Frames to display
+    are handed to the service loop through `frames`, since HighGUI must
+    only be driven from one thread."""
+    capture = FrameCapture(config["source"])
+    if not capture.start():
+        print(f"❌ Camera {source_id} not accessible")
+        return
 
-            if dists[idx] < THRESHOLD:
-                name = known_names[idx]
-                match_counter[name] = match_counter.get(name, 0) + 1
+    print(f"🎥 Camera {source_id} started")
+    stats = SourceStats()
+
+    try:
+        for frame, tracks, confirmed, timings in process_source(capture, executor):
+            for track in confirmed:
+                mark_attendance(recognitions, track, config["room"])
+
+            stats.add(frame, timings)
+            if stats.due():
+                events.put(("stats", source_id, stats.snapshot(capture.dropped)))
+
+            if SHOW_WINDOWS:
+                frames[source_id] = frame.image
+            if stop.is_set():
+                break
+    finally:
+        capture.stop()
+        frames.pop(source_id, None)
+        print(f"⏹ Camera {source_id} stopped")
+
+# ===================== CAMERA SERVICE =====================
+# one process drives every source: a capture + tracking thread per source,
+# one analysis worker pool shared by all of them, and one gallery in shared
+# memory that the workers read without copying
+
+
+def run_service(commands, events, ready, recognitions):
+    print("📷 Camera Service Python:", sys.executable)
+    if not load_models():
+        events.put(("failed", None, None))
+        return
 
-                if match_counter[name] >= REQUIRED_FRAMES and blink_count >= 1:
-                    mark_attendance(name)
+    shm, gallery_spec = gallery.share()
+    executor = make_executor(gallery_spec)
+    ready.set()
+
+    workers = {}
+    frames = {}
+
+    def start_source(source_id):
+        thread, stop = workers.get(source_id, (None, None))
+        if thread is not None and thread.is_alive():
+            return
+        stop = threading.Event()
+
+        def run():
+            run_source(source_id, CAMERA_SOURCES[source_id],
+                       executor, stop, frames, recognitions, events)
+            events.put(("stopped", source_id, None))
+
+        thread = threading.Thread(
+            target=run, name=f"camera-{source_id}", daemon=True)
+        workers[source_id] = (thread, stop)
+        thread.start()
+
+    def stop_source(source_id):
+        thread, stop = workers.pop(source_id, (None, None))
+        if thread is not None:
+            stop.set()
+            thread.join(timeout=5)
+
+    try:
+        while True:
+            try:
+                command, source_id = commands.get(timeout=0.02)
+            except queue.Empty:
+                command = None
+
+            if command == "start":
+                start_source(source_id)
+            elif command == "stop":
+                stop_source(source_id)
+            elif command == "shutdown":
+                break
+
+            if SHOW_WINDOWS:
+                shown = set()
+                for source_id, image in list(frames.items()):
+                    cv2.imshow(f"Attendance Camera {source_id}", image)
+                    shown.add(source_id)
+                if shown and cv2.waitKey(1) & 0xFF == ord("q"):
                     break
-
-        cv2.imshow("Attendance Camera", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+    finally:
+        for source_id in list(workers):
+            stop_source(source_id)
+        executor.shutdown(wait=False, cancel_futures=True)
+        shm.close()
+        shm.unlink()
+        cv2.destroyAllWindows()
 
 # ===================== CONTROLLER =====================
 
 
 camera_process = None
-
-
-def start_camera():
-    global camera_process
+camera_ready = None
+camera_commands = None
+camera_events = None
+camera_recognitions = None
+active_sources = set()
+# source id -> latest SourceStats snapshot
+camera_stats = {}
+# gallery folder labels that resolve to no student, checked at start
+unresolved_labels = []
+
+
+def _drain_events():
+    if camera_events is None:
+        return
+    while True:
+        try:
+            event, source_id, data = camera_events.get_nowait()
+        except queue.Empty:
+            return
+        if event == "stopped":
+            active_sources.discard(source_id)
+            if source_id in camera_stats:
+                camera_stats[source_id]["fps"] = 0.0
+        elif event == "failed":
+            active_sources.clear()
+        elif event == "stats":
+            camera_stats[source_id] = data
+
+
+def folder_labels():
+    if FACE_SOURCE not in ("folder", "both") or not os.path.isdir(STUDENTS_FOLDER):
+        return []
+    return [name for name in os.listdir(STUDENTS_FOLDER)
+            if os.path.isdir(os.path.join(STUDENTS_FOLDER, name))]
+
+
+def _ensure_service():
+    global camera_process, camera_ready, camera_commands, camera_events
+    global camera_recognitions, unresolved_labels
     if camera_process is None or not camera_process.is_alive():
-        camera_process = multiprocessing.Process(target=run_camera)
+        from camera_attendance import camera_attendance
+
+        camera_ready = multiprocessing.Event()
+        camera_commands = multiprocessing.Queue()
+        camera_events = multiprocessing.Queue()
+        camera_recognitions = multiprocessing.Queue()
+        active_sources.clear()
+        camera_process = multiprocessing.Process(
+            target=run_service,
+            args=(camera_commands, camera_events, camera_ready,
+                  camera_recognitions))
         camera_process.start()
-        print("▶ Camera process started")
+        camera_attendance.start(camera_recognitions)
+        unresolved_labels = camera_attendance.check_labels(folder_labels())
+        logger.info("camera process started",
+                    extra={"pid": camera_process.pid})
+
+
+def start_camera(source_id=None):
+    """Start one configured source, or all of them when source_id is
+    None."""
+    source_ids = list(CAMERA_SOURCES) if source_id is None else [source_id]
+    for source_id in source_ids:
+        if source_id not in CAMERA_SOURCES:
+            raise KeyError(source_id)
+
+    _ensure_service()
+    _drain_events()
+    for source_id in source_ids:
+        camera_commands.put(("start", source_id))
+        active_sources.add(source_id)
+
+
+def stop_camera(source_id=None):
+    """Stop one source, or the whole camera process when source_id is
+    None."""
+    global camera_process
+    if not (camera_process and camera_process.is_alive()):
+        return
 
+    if source_id is not None:
+        if source_id not in CAMERA_SOURCES:
+            raise KeyError(source_id)
+        camera_commands.put(("stop", source_id))
+        active_sources.discard(source_id)
+        return
 
-def stop_camera():
-    global camera_process
-    if camera_process and camera_process.is_alive():
+    # let the service shut its worker pool down, then force it
+    camera_commands.put(("shutdown", None))
+    camera_process.join(timeout=10)
+    if camera_process.is_alive():
         camera_process.terminate()
         camera_process.join()
-        camera_process = None
-        print("⏹ Camera process stopped")
+    camera_process = None
+    active_sources.clear()
+    logger.info("camera process stopped")
+
+
+def camera_status():
+    running = camera_process is not None and camera_process.is_alive()
+    _drain_events()
+    return {
+        "running": running,
+        "models_loaded": running and camera_ready.is_set(),
+        "unresolved_labels": unresolved_labels,
+        "sources": {
+            source_id: running and source_id in active_sources
+            for source_id in CAMERA_SOURCES
+        }
+    }
+
+
+def camera_metrics():
+    """Latest per-source stats reported by the camera process."""
+    _drain_events()
+    running = camera_process is not None and camera_process.is_alive()
+    return {
+        source_id: dict(stats, fps=stats["fps"] if running else 0.0)
+        for source_id, stats in camera_stats.items()
+    }
 
 # ===================== MAIN =====================
 
 
 if __name__ == "__main__":
+    setup_logging()
     start_camera()
@@ -0,0 +1,119 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------- SETTINGS --------------------
+
+# bcrypt, PIL/OpenCV decoding and the model all release the GIL, so a
+# thread pool is enough to use every core; what matters is that it is not
+# the pool the cheap endpoints run in
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(os.cpu_count() or 2)))
+# tasks accepted (running + queued) before new ones are turned away
+COMPUTE_MAX_PENDING = int(os.getenv("COMPUTE_MAX_PENDING",
+                                    str(COMPUTE_WORKERS * 32)))
+
+
+# -------------------- POOL --------------------
+
+class PoolBusy(Exception):
+    pass
+
+
+class ComputePool:
+    """Bounded pool for CPU-heavy work, kept apart from the threadpool
+    that serves sync endpoints so a burst of logins or uploads can't starve
+    them. Submitting past max_pending raises PoolBusy instead of queueing
+    without limit."""
+
+    def __init__(self, name, workers=COMPUTE_WORKERS,
+                 max_pending=COMPUTE_MAX_PENDING):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolBusy(f"{self.name} pool is full")
+            self.pending += 1
+
+        queued_at = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.active += 1
+                wait = started - queued_at
+                self.wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.run_seconds += time.perf_counter() - started
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        def release(future):
+            # also runs for a queued task cancelled before it started (an
+            # awaiting request went away), whose slot task() never frees
+            with self._lock:
+                self.pending -= 1
+                if future.cancelled():
+                    self.cancelled += 1
+
+        try:
+            future = self.executor.submit(task)
+        except RuntimeError:
+            with self._lock:
+                self.pending -= 1
+            raise
+        future.add_done_callback(release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) on the pool."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "active": self.active,
+                "queued": self.pending - self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "mean_wait_ms": round(self.wait_seconds / done * 1000, 3) if done else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "mean_run_ms": round(self.run_seconds / done * 1000, 3) if done else 0.0,
+            }
+
+
+cpu_pool = ComputePool("cpu")
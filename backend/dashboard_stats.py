@@ -0,0 +1,130 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+from sqlalchemy import select, func
+
+from database import SessionLocal, Attendance, Students, Faculty, Lecture
+
+# -------------------- SETTINGS --------------------
+
+DASHBOARD_TTL_SECONDS = float(os.getenv("DASHBOARD_TTL_SECONDS", "2"))
+
+
+# -------------------- STATS --------------------
+
+class DashboardStats:
+    """Dashboard aggregates kept in memory.
+
+    Attendance, the one large table, is aggregated once with GROUP BY
+    queries; after that only rows above the last seen id (the high-water
+    mark) are read. That is exact because attendance is append-only
+    (re-marks are upserts that keep their row) and has a single writer,
+    the attendance writer thread, so ids commit in order. Students,
+    faculty and lectures are inserted by concurrent requests, whose ids
+    can commit out of order on PostgreSQL, and are small, so they are
+    recounted on every refresh. Snapshots are served from memory for
+    DASHBOARD_TTL_SECONDS."""
+
+    def __init__(self, session_factory=SessionLocal, ttl=DASHBOARD_TTL_SECONDS):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._snapshot = None
+
+        self.students = 0
+        self.faculty = 0
+        self.attendance = 0
+        self.attendance_by_day = {}
+        self.attendance_by_lecture = {}
+        self.faculty_by_department = {}
+        self.lectures = {}
+
+        self._attendance_hwm = 0
+
+    def is_fresh(self):
+        return (self._refreshed_at is not None
+                and time.monotonic() - self._refreshed_at < self.ttl)
+
+    def snapshot(self):
+        """Latest aggregates, refreshing them first if the TTL expired."""
+        if self.is_fresh():
+            return self._snapshot
+
+        with self._lock:
+            if not self.is_fresh():
+                self._refresh()
+            return self._snapshot
+
+    def _refresh(self):
+        db = self.session_factory()
+        try:
+            self._refresh_students(db)
+            self._refresh_faculty(db)
+            self._refresh_lectures(db)
+            self._refresh_attendance(db)
+        finally:
+            db.close()
+
+        self._snapshot = self._build()
+        self._refreshed_at = time.monotonic()
+
+    def _refresh_students(self, db):
+        self.students = db.execute(select(func.count(Students.id))).scalar_one()
+
+    def _refresh_faculty(self, db):
+        self.faculty_by_department = dict(db.execute(
+            select(Faculty.department, func.count())
+            .group_by(Faculty.department)
+        ).all())
+        self.faculty = sum(self.faculty_by_department.values())
+
+    def _refresh_lectures(self, db):
+        self.lectures = dict(db.execute(
+            select(Lecture.id, Lecture.subject_name)
+        ).all())
+
+    def _refresh_attendance(self, db):
+        day = func.date(Attendance.timestamp)
+        rows = db.execute(
+            select(Attendance.lecture_id, day, func.count(),
+                   func.max(Attendance.id))
+            .where(Attendance.id > self._attendance_hwm)
+            .group_by(Attendance.lecture_id, day)
+        ).all()
+        for lecture_id, date, count, last in rows:
+            date = str(date)
+            self.attendance += count
+            self.attendance_by_day[date] = (
+                self.attendance_by_day.get(date, 0) + count)
+            self.attendance_by_lecture[lecture_id] = (
+                self.attendance_by_lecture.get(lecture_id, 0) + count)
+            self._attendance_hwm = max(self._attendance_hwm, last)
+
+    def _build(self):
+        # timestamps are stored in UTC
+        today = datetime.utcnow().date().isoformat()
+
+        return {
+            "total_faculty": self.faculty,
+            "total_students": self.students,
+            "total_attendance": self.attendance,
+            "today_attendance": self.attendance_by_day.get(today, 0),
+            "faculty_by_department": dict(self.faculty_by_department),
+            "lectures": [
+                {
+                    "lecture_id": lecture_id,
+                    "subject_name": self.lectures.get(lecture_id),
+                    "attendance": count,
+                    "attendance_rate": (
+                        round(count / self.students, 4) if self.students else 0.0)
+                }
+                for lecture_id, count in sorted(self.attendance_by_lecture.items(),
+                                                key=lambda item: str(item[0]))
+            ]
+        }
+
+
+dashboard_stats = DashboardStats()
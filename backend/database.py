@@ -0,0 +1,217 @@
+import os
+
+from sqlalchemy import create_engine, event, Column, Integer, String, Boolean, DateTime, ForeignKey, Float, LargeBinary, Index
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from datetime import datetime
+
+from metrics import instrument_engine
+
+# -------------------- DATABASE --------------------
+
+SQLALCHEMY_DATABASE_URL = os.getenv(
+    "DATABASE_URL", "sqlite:///./attendance.db")
+
+# server databases (PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str) -> dict:
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run while the attendance writer commits, and
+    # synchronous=NORMAL is still durable across application crashes in
+    # WAL mode
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    instrument_engine(engine)
+    return engine
+
+
+engine = create_db_engine()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+Base = declarative_base()
+
+
+# -------------------- MODELS --------------------
+
+class Faculty(Base):
+    __tablename__ = "faculty"
+
+    id = Column(Integer, primary_key=True, index=True)
+    faculty_id = Column(String, unique=True, index=True)
+    full_name = Column(String)
+    department = Column(String)
+    email = Column(String, unique=True, index=True)
+    hashed_password = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Lecture(Base):
+    __tablename__ = "lectures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    subject_name = Column(String)
+    room = Column(String)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    is_active = Column(Boolean, default=True)
+
+
+class Attendance(Base):
+    __tablename__ = "attendance"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # the roll number (Students.student_id), like everywhere else
+    student_id = Column(Integer, ForeignKey("students.student_id"))
+    lecture_id = Column(Integer, ForeignKey("lectures.id"))
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    is_verified = Column(Boolean)
+    confidence_score = Column(Float, default=0.0)
+    status = Column(String, default="verified")
+
+    __table_args__ = (
+        # one mark per student per lecture; writes upsert on it
+        Index("ux_attendance_student_lecture",
+              "student_id", "lecture_id", unique=True),
+        Index("ix_attendance_lecture_timestamp", "lecture_id", "timestamp"),
+        Index("ix_attendance_student_timestamp", "student_id", "timestamp"),
+        Index("ix_attendance_timestamp", "timestamp"),
+    )
+
+
+class Students(Base):
+    __tablename__ = "students"
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, unique=True, index=True)
+    full_name = Column(String)
+    face_encoding = Column(String, nullable=True)
+    qr_encoding = Column(String, nullable=True)
+    id_card_hash = Column(String, nullable=True)
+    fingerprint_data = Column(String, nullable=True)
+
+
+class BiometricTemplate(Base):
+    """One face or fingerprint sample of a student, as a binary template
+    (see biometric_templates.py). A student can have many samples per
+    modality."""
+    __tablename__ = "biometric_templates"
+
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.student_id"),
+                        nullable=False)
+    modality = Column(String, nullable=False)
+    model_id = Column(String, nullable=False)
+    # what the template was computed from, e.g. the fingerprint image path
+    source = Column(String, nullable=True)
+    template = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # the gallery / index bulk loads scan one (modality, model) at a time
+        Index("ix_templates_modality_model_student",
+              "modality", "model_id", "student_id"),
+        Index("ix_templates_student", "student_id"),
+    )
+
+
+def init_db():
+    from migrations import migrate
+
+    Base.metadata.create_all(bind=engine)
+    migrate(engine, Base.metadata)
+
+
+init_db()
+
+
+# -------------------- DEPENDENCY --------------------
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# -------------------- ASYNC --------------------
+# /login, /register, /add-student and /add-lecture run on this engine, so
+# its driver is required: aiosqlite is a core dependency, asyncpg comes
+# with the postgres extra. It is still created on first use, which keeps
+# scripts that only import the models free of it.
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+async_engine = None
+AsyncSessionLocal = None
+
+
+def async_database_url(url: str = SQLALCHEMY_DATABASE_URL) -> str:
+    scheme, rest = url.split("://", 1)
+    # drop an explicit sync driver, e.g. postgresql+psycopg
+    backend = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(backend, scheme)}://{rest}"
+
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = async_database_url()
+        async_engine = create_async_engine(url, **engine_options(url))
+        if is_sqlite(url):
+            event.listen(async_engine.sync_engine,
+                         "connect", set_sqlite_pragmas)
+        instrument_engine(async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine, autoflush=False, expire_on_commit=False)
+
+    return AsyncSessionLocal
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
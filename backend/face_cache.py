@@ -0,0 +1,132 @@
+import os
+import json
+
+import numpy as np
+import face_recognition
+
+from face_gallery import ENCODING_DIM
+
+# ===================== SETTINGS =====================
+CACHE_DIR = os.getenv("FACE_CACHE_DIR", ".face_cache")
+ENCODINGS_FILE = "encodings.npy"
+MANIFEST_FILE = "manifest.json"
+IMAGE_EXTS = (".jpg", ".png", ".jpeg")
+
+# ===================== FOLDER CACHE =====================
+
+
+def _read_cache(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    encodings_path = os.path.join(cache_dir, ENCODINGS_FILE)
+
+    if not (os.path.exists(manifest_path) and os.path.exists(encodings_path)):
+        return {}, np.empty((0, ENCODING_DIM), dtype=np.float32)
+
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        encodings = np.load(encodings_path, mmap_mode="r")
+    except (OSError, ValueError) as exc:
+        print("⚠ Face cache unreadable, rebuilding:", exc)
+        return {}, np.empty((0, ENCODING_DIM), dtype=np.float32)
+
+    return manifest.get("files", {}), encodings
+
+
+def _write_cache(cache_dir, files, encodings):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    encodings_path = os.path.join(cache_dir, ENCODINGS_FILE)
+
+    # write next to the target and swap in, so a crash never leaves a
+    # manifest pointing at rows that don't exist
+    np.save(encodings_path + ".tmp.npy", encodings)
+    os.replace(encodings_path + ".tmp.npy", encodings_path)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump({"files": files}, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def load_folder_encodings(folder, cache_dir=CACHE_DIR):
+    """Encodings for every image under folder/<student>/, re-encoding only
+    images that are new or whose mtime/size changed since the last run.
+
+    Images without a detectable face are remembered too (row -1) so they
+    aren't retried on every start."""
+    cached_files, cached = _read_cache(cache_dir)
+
+    files = {}
+    rows = []
+    names = []
+    reused = 0
+    changed = False
+
+    for student in sorted(os.listdir(folder)):
+        student_dir = os.path.join(folder, student)
+        if not os.path.isdir(student_dir):
+            continue
+
+        for img in sorted(os.listdir(student_dir)):
+            if not img.lower().endswith(IMAGE_EXTS):
+                continue
+
+            path = os.path.join(student_dir, img)
+            st = os.stat(path)
+            entry = cached_files.get(path)
+
+            if (entry and entry["mtime"] == st.st_mtime
+                    and entry["size"] == st.st_size
+                    and entry["row"] < len(cached)):
+                encoding = cached[entry["row"]] if entry["row"] >= 0 else None
+                reused += 1
+            else:
+                image = face_recognition.load_image_file(path)
+                encs = face_recognition.face_encodings(image)
+                encoding = encs[0] if encs else None
+                changed = True
+                if encoding is not None:
+                    print(f"✅ Loaded {student}/{img}")
+
+            row = -1
+            if encoding is not None:
+                row = len(rows)
+                rows.append(encoding)
+                names.append(student)
+            files[path] = {"mtime": st.st_mtime,
+                           "size": st.st_size, "row": row}
+
+    if len(files) != len(cached_files):
+        changed = True
+
+    if not changed:
+        print(f"♻ Reused {reused} cached face encodings")
+        return cached, names
+
+    encodings = np.asarray(rows, dtype=np.float32).reshape(-1, ENCODING_DIM)
+    # the reused rows were copied above; drop every view of the old memmap
+    # before replacing its file, Windows refuses to replace a mapped file
+    rows = cached = None
+    _write_cache(cache_dir, files, encodings)
+    return encodings, names
+
+# ===================== DATABASE =====================
+
+
+def load_db_encodings(database_url):
+    """(encodings, labels) of every face template in the database, read
+    and decoded in one pass. Labels are "<student_id> <full name>", so
+    they resolve to the student exactly."""
+    from sqlalchemy import create_engine
+    from biometric_templates import load_templates, FACE, FACE_MODEL_ID
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        student_ids, names, _, encodings = load_templates(
+            conn, FACE, FACE_MODEL_ID, ENCODING_DIM)
+    engine.dispose()
+
+    names = [f"{student_id} {name}"
+             for student_id, name in zip(student_ids.tolist(), names)]
+
+    print(f"✅ Loaded {len(encodings)} face encodings from database")
+    return encodings, names
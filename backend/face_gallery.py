@@ -0,0 +1,153 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+ENCODING_DIM = 128
+
+# arrays a gallery is made of, in the order they are laid out in shared
+# memory
+SHARED_ARRAYS = ("encodings", "labels", "offsets", "sq",
+                 "centroids", "centroid_sq")
+
+# ===================== DISTANCES =====================
+
+
+def euclidean(queries, matrix, matrix_sq):
+    """Pairwise euclidean distances, (n_queries, n_rows), in one GEMM."""
+    query_sq = np.einsum("ij,ij->i", queries, queries)[:, None]
+    d2 = query_sq - 2.0 * (queries @ matrix.T) + matrix_sq[None, :]
+    np.maximum(d2, 0.0, out=d2)
+    return np.sqrt(d2, out=d2)
+
+# ===================== GALLERY =====================
+
+
+class FaceGallery:
+    """Known face encodings as one contiguous float32 matrix.
+
+    mode:
+      "samples"   - compare against every enrolled sample
+      "centroid"  - compare against one mean encoding per student
+      "shortlist" - rank students by centroid, then compare against all
+                    samples of the shortlist_k closest students
+    """
+
+    MODES = ("samples", "centroid", "shortlist")
+
+    def __init__(self, encodings, names, mode="samples", shortlist_k=8):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown match mode: {mode}")
+        self.mode = mode
+        self.shortlist_k = shortlist_k
+
+        encodings = np.asarray(encodings, dtype=np.float32)
+        encodings = encodings.reshape(-1, ENCODING_DIM)
+        self.students, labels = np.unique(
+            np.asarray(names, dtype=str), return_inverse=True)
+
+        # group samples by student so each one owns a contiguous block
+        order = np.argsort(labels, kind="stable")
+        self.encodings = np.ascontiguousarray(encodings[order])
+        self.labels = labels[order]
+        self.offsets = np.searchsorted(
+            self.labels, np.arange(len(self.students) + 1))
+        self.sq = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+        counts = np.diff(self.offsets)
+        if len(self.encodings):
+            sums = np.add.reduceat(self.encodings, self.offsets[:-1], axis=0)
+        else:
+            sums = np.empty((0, ENCODING_DIM), dtype=np.float32)
+        self.centroids = np.ascontiguousarray(
+            sums / counts[:, None], dtype=np.float32)
+        self.centroid_sq = np.einsum(
+            "ij,ij->i", self.centroids, self.centroids)
+
+    def __len__(self):
+        return len(self.encodings)
+
+    def share(self):
+        """Copy the gallery into one shared memory block.
+
+        Returns the SharedMemory (the caller owns it and must unlink it)
+        and a small picklable spec that other processes pass to attach()."""
+        arrays = [np.ascontiguousarray(getattr(self, name))
+                  for name in SHARED_ARRAYS]
+
+        layout = []
+        size = 0
+        for name, array in zip(SHARED_ARRAYS, arrays):
+            size = (size + 7) // 8 * 8
+            layout.append((name, array.shape, array.dtype.str, size))
+            size += array.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (name, shape, dtype, offset), array in zip(layout, arrays):
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                       offset=offset)[...] = array
+
+        spec = {
+            "name": shm.name,
+            "layout": layout,
+            "students": [str(s) for s in self.students],
+            "mode": self.mode,
+            "shortlist_k": self.shortlist_k,
+        }
+        return shm, spec
+
+    @classmethod
+    def attach(cls, spec):
+        """Zero-copy view of a gallery published with share()."""
+        try:
+            # the owner unlinks the block, not every process that reads it
+            shm = shared_memory.SharedMemory(name=spec["name"], track=False)
+        except TypeError:  # Python < 3.13
+            shm = shared_memory.SharedMemory(name=spec["name"])
+
+        gallery = cls.__new__(cls)
+        gallery._shm = shm
+        gallery.mode = spec["mode"]
+        gallery.shortlist_k = spec["shortlist_k"]
+        gallery.students = np.asarray(spec["students"], dtype=str)
+        for name, shape, dtype, offset in spec["layout"]:
+            array = np.ndarray(tuple(shape), dtype=dtype,
+                               buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            setattr(gallery, name, array)
+        return gallery
+
+    def match(self, queries):
+        """Best (name, distance) for every query encoding."""
+        queries = np.asarray(queries, dtype=np.float32)
+        queries = queries.reshape(-1, ENCODING_DIM)
+
+        if len(queries) == 0 or len(self.encodings) == 0:
+            return [(None, np.inf)] * len(queries)
+
+        if self.mode == "samples":
+            d = euclidean(queries, self.encodings, self.sq)
+            best = d.argmin(axis=1)
+            return [(str(self.students[self.labels[i]]), float(d[q, i]))
+                    for q, i in enumerate(best)]
+
+        d = euclidean(queries, self.centroids, self.centroid_sq)
+
+        if self.mode == "centroid":
+            best = d.argmin(axis=1)
+            return [(str(self.students[i]), float(d[q, i]))
+                    for q, i in enumerate(best)]
+
+        k = min(self.shortlist_k, len(self.students))
+        shortlist = np.argpartition(d, k - 1, axis=1)[:, :k]
+
+        results = []
+        for query, students in zip(queries, shortlist):
+            rows = np.concatenate([
+                np.arange(self.offsets[s], self.offsets[s + 1])
+                for s in students
+            ])
+            rd = euclidean(query[None, :], self.encodings[rows],
+                           self.sq[rows])[0]
+            i = rows[rd.argmin()]
+            results.append(
+                (str(self.students[self.labels[i]]), float(rd.min())))
+        return results
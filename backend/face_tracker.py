@@ -0,0 +1,124 @@
+import itertools
+
+# ===================== TRACKS =====================
+
+_track_ids = itertools.count(1)
+
+
+class Track:
+    """One face followed across frames. Recognition state lives here
+    instead of being shared by everyone in view; blink state is kept by
+    the liveness engine, per identity."""
+
+    def __init__(self, box):
+        self.id = next(_track_ids)
+        self.box = box
+        self.tracker = None
+        # only set on frames where the face was freshly encoded
+        self.encoding = None
+        self.match = None
+
+        self.missed = 0
+
+        self.name = None
+        self.matches = 0
+        self.marked = False
+
+
+def iou(a, b):
+    top = max(a[0], b[0])
+    right = min(a[1], b[1])
+    bottom = min(a[2], b[2])
+    left = max(a[3], b[3])
+
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+# ===================== TRACKER =====================
+
+
+class FaceTracker:
+    """Associates keyframe detections with existing tracks by IoU and
+    follows the boxes with dlib correlation trackers in between."""
+
+    def __init__(self, iou_threshold=0.3, min_psr=7.0, max_missed=2):
+        import dlib
+
+        self._dlib = dlib
+        self.iou_threshold = iou_threshold
+        self.min_psr = min_psr
+        self.max_missed = max_missed
+        self.tracks = []
+        # set when a track is lost between keyframes, so the caller can
+        # ask for a fresh detection straight away
+        self.lost = False
+
+    def _start_tracker(self, gray, box):
+        top, right, bottom, left = box
+        tracker = self._dlib.correlation_tracker()
+        tracker.start_track(
+            gray, self._dlib.rectangle(left, top, right, bottom))
+        return tracker
+
+    def on_detections(self, gray, analysis):
+        candidates = sorted(
+            ((iou(track.box, box), t, d)
+             for t, track in enumerate(self.tracks)
+             for d, box in enumerate(analysis.boxes)),
+            reverse=True
+        )
+
+        assigned = {}
+        used = set()
+        for score, t, d in candidates:
+            if score < self.iou_threshold:
+                break
+            if t in used or d in assigned:
+                continue
+            used.add(t)
+            assigned[d] = self.tracks[t]
+
+        tracks = []
+        for d, box in enumerate(analysis.boxes):
+            track = assigned.get(d) or Track(box)
+            track.box = box
+            track.encoding = analysis.encodings[d]
+            track.match = analysis.matches[d] if analysis.matches else None
+            track.tracker = self._start_tracker(gray, box)
+            track.missed = 0
+            tracks.append(track)
+
+        # a face the detector missed once keeps its state for a few
+        # keyframes and is followed by its correlation tracker meanwhile
+        for t, track in enumerate(self.tracks):
+            if t in used:
+                continue
+            track.missed += 1
+            if track.missed <= self.max_missed and self._follow(gray, track):
+                tracks.append(track)
+
+        self.tracks = tracks
+        self.lost = False
+        return tracks
+
+    def _follow(self, gray, track):
+        if track.tracker.update(gray) < self.min_psr:
+            return False
+
+        pos = track.tracker.get_position()
+        track.box = (int(pos.top()), int(pos.right()),
+                     int(pos.bottom()), int(pos.left()))
+        track.encoding = None
+        track.match = None
+        return True
+
+    def on_frame(self, gray):
+        alive = [track for track in self.tracks if self._follow(gray, track)]
+        if len(alive) < len(self.tracks):
+            self.lost = True
+
+        self.tracks = alive
+        return alive
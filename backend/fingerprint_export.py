@@ -0,0 +1,270 @@
+"""Export the fingerprint embedder for lightweight CPU inference and check
+it against the Keras model.
+
+    python fingerprint_export.py export --quantization float16
+    python fingerprint_export.py compare fingerprint_embedder.tflite fp16.tflite
+
+`export` converts fingerprint_embedder.keras (or the tower inside
+fingerprint_verifier.keras) to TFLite, optionally float16 or int8
+quantized, and saves the siamese head weights next to it. `compare` runs
+every model over fingerprint_data in a fresh process each and prints a
+JSON report: score and decision parity with Keras, pair accuracy, load
+time, per-image latency and peak RSS.
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from fingerprint_preprocess import load_batch
+
+DATA_FOLDER = "fingerprint_data"
+# images fed to the int8 converter to calibrate activation ranges
+CALIBRATION_IMAGES = 100
+THRESHOLD = 0.5
+
+
+def dataset_paths(folder=DATA_FOLDER):
+    return sorted(os.path.join(folder, f)
+                  for f in os.listdir(folder) if f.endswith(".tif"))
+
+
+# -------------------- EXPORT --------------------
+
+def export_tflite(embedder, path, quantization=None, calibration_paths=()):
+    """Convert a Keras embedder to TFLite. quantization is None, "dynamic",
+    "float16" or "int8" (weights and activations; inputs and outputs stay
+    float32)."""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(embedder)
+
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        calibration = list(calibration_paths)[:CALIBRATION_IMAGES]
+        if not calibration:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for image in load_batch(calibration):
+                yield [image[None]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    elif quantization not in (None, "dynamic"):
+        raise ValueError(f"Unknown quantization {quantization}")
+
+    data = converter.convert()
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def export_head(weights, bias, path):
+    np.savez(path, weights=np.asarray(weights, dtype=np.float32).reshape(-1),
+             bias=np.float32(bias))
+
+
+# -------------------- COMPARE --------------------
+
+def finger_of(path):
+    """"<person>_<finger>" of a <person>_<finger>_<scan>.tif file name
+    (see fingerprint_data/readme.txt)."""
+    return "_".join(os.path.basename(path).split("_")[:2])
+
+
+def group_by_finger(paths):
+    """finger -> indices into paths"""
+    groups = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(finger_of(path), []).append(i)
+    return groups
+
+
+def make_pairs(paths, seed=0):
+    """Genuine pairs of consecutive prints of the same finger and as many
+    random impostor pairs, as (i, j, label) index triples."""
+    by_finger = group_by_finger(paths)
+
+    pairs = [(a, b, 1) for items in by_finger.values()
+             for a, b in zip(items, items[1:])]
+
+    rng = random.Random(seed)
+    fingers = list(by_finger)
+    for _ in range(len(pairs)):
+        f1, f2 = rng.sample(fingers, 2)
+        pairs.append((rng.choice(by_finger[f1]), rng.choice(by_finger[f2]), 0))
+    return pairs
+
+
+def scores(embeddings, pairs, weights, bias):
+    a = embeddings[[i for i, _, _ in pairs]]
+    b = embeddings[[j for _, j, _ in pairs]]
+    logits = np.abs(a - b) @ weights + bias
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def percentiles_ms(values):
+    ms = np.asarray(values) * 1000.0
+    return {"p50": round(float(np.percentile(ms, 50)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3)}
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process, or None where the resource
+    module doesn't exist (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def probe(model, paths, output, latency_samples):
+    """Runs in its own process: load one runtime, time it, and save the
+    embeddings of every print to `output`."""
+    if model == "keras":
+        os.environ["FINGERPRINT_RUNTIME"] = "keras"
+    else:
+        os.environ["FINGERPRINT_RUNTIME"] = "tflite"
+        os.environ["FINGERPRINT_TFLITE_PATH"] = model
+
+    import verify
+
+    started = time.perf_counter()
+    verify.load_models()
+    load_seconds = time.perf_counter() - started
+
+    images = load_batch(paths)
+    verify.embed_batch(images[:1])
+
+    latencies = []
+    for image in images[:latency_samples]:
+        t = time.perf_counter()
+        verify.embed_batch(image[None])
+        latencies.append(time.perf_counter() - t)
+
+    embeddings = np.concatenate([verify.embed_batch(images[i:i + 32])
+                                 for i in range(0, len(images), 32)])
+    np.save(output, embeddings)
+
+    print(json.dumps({
+        "load_seconds": round(load_seconds, 3),
+        "latency_ms": percentiles_ms(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def run_probe(model, folder, latency_samples, output):
+    result = subprocess.run(
+        [sys.executable, __file__, "probe", model, "--data", folder,
+         "--output", output, "--latency-samples", str(latency_samples)],
+        check=True, capture_output=True, text=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, np.load(output)
+
+
+def compare(models, folder, latency_samples):
+    import verify
+
+    paths = dataset_paths(folder)
+    pairs = make_pairs(paths)
+    labels = np.array([label for _, _, label in pairs])
+
+    # every runtime is scored with the same head, so differences come
+    # from the embedder alone
+    weights, bias = verify.load_head()
+
+    report = {"images": len(paths), "pairs": len(pairs), "models": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        reference, reference_scores = None, None
+        for n, model in enumerate(["keras"] + list(models)):
+            result, embeddings = run_probe(model, folder, latency_samples,
+                                           os.path.join(tmp, f"{n}.npy"))
+            model_scores = scores(embeddings, pairs, weights, bias)
+            decisions = model_scores >= THRESHOLD
+
+            result["size_mb"] = (round(os.path.getsize(model) / 2**20, 2)
+                                 if model != "keras" else None)
+            # the pairs come from the training data, so this tracks parity
+            # with Keras rather than generalization
+            result["pair_accuracy"] = round(float(np.mean(decisions == labels)), 4)
+
+            if reference is None:
+                reference, reference_scores = embeddings, model_scores
+            else:
+                result["max_embedding_diff"] = round(
+                    float(np.abs(embeddings - reference).max()), 6)
+                result["max_score_diff"] = round(
+                    float(np.abs(model_scores - reference_scores).max()), 6)
+                result["decision_agreement"] = round(float(np.mean(
+                    decisions == (reference_scores >= THRESHOLD))), 4)
+
+            report["models"][model] = result
+    return report
+
+
+# -------------------- CLI --------------------
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export")
+    export.add_argument("--quantization",
+                        choices=["none", "dynamic", "float16", "int8"],
+                        default="none")
+    export.add_argument("--data", default=DATA_FOLDER)
+    export.add_argument("-o", "--output")
+
+    comparison = commands.add_parser("compare")
+    comparison.add_argument("models", nargs="*",
+                            help="TFLite files to compare with Keras")
+    comparison.add_argument("--data", default=DATA_FOLDER)
+    comparison.add_argument("--latency-samples", type=int, default=50)
+
+    probing = commands.add_parser("probe")
+    probing.add_argument("model")
+    probing.add_argument("--data", default=DATA_FOLDER)
+    probing.add_argument("--output", required=True)
+    probing.add_argument("--latency-samples", type=int, default=50)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        import verify
+
+        _, tower, weights, bias = verify.load_keras_models()
+        quantization = None if args.quantization == "none" else args.quantization
+        output = args.output or verify.TFLITE_PATH
+        size = export_tflite(tower, output, quantization,
+                             dataset_paths(args.data))
+        export_head(weights, bias, verify.HEAD_PATH)
+        print(f"Exported {output} ({size / 2**20:.2f} MB) and {verify.HEAD_PATH}")
+
+    elif args.command == "compare":
+        models = args.models or [
+            os.getenv("FINGERPRINT_TFLITE_PATH", "fingerprint_embedder.tflite")]
+        print(json.dumps(compare(models, args.data, args.latency_samples),
+                         indent=2))
+
+    else:
+        probe(args.model, dataset_paths(args.data), args.output,
+              args.latency_samples)
+
+
+if __name__ == "__main__":
+    main()
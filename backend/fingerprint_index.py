@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+
+import verify
+
+# ===================== SETTINGS =====================
+SEARCH_CHUNK = 65536
+
+# ===================== INDEX =====================
+
+
+class FingerprintIndex:
+    """In-memory matrix of enrolled fingerprint embeddings for 1:N
+    identification.
+
+    The siamese head scores a weighted L1 distance, which the usual ANN
+    libraries don't index, so search is an exact vectorized scan in
+    chunks of SEARCH_CHUNK rows."""
+
+    def __init__(self, dim=verify.EMBEDDING_DIM):
+        self.dim = dim
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, rows):
+        """Replace the index contents with (student_id, embedding) rows."""
+        with self._lock:
+            rows = list(rows)
+            self._matrix = np.empty((max(len(rows), 16), self.dim),
+                                    dtype=np.float32)
+            self._ids = np.empty(len(self._matrix), dtype=np.int64)
+            self._rows = {}
+            for student_id, embedding in rows:
+                self._append(student_id, embedding)
+            self.loaded = True
+
+    def load_matrix(self, ids, matrix):
+        """Replace the index contents with an (n,) id array and an
+        (n, dim) embedding matrix, as bulk loaded from the templates."""
+        with self._lock:
+            n = len(ids)
+            self._matrix = np.empty((max(n, 16), self.dim), dtype=np.float32)
+            self._ids = np.empty(len(self._matrix), dtype=np.int64)
+            self._matrix[:n] = matrix
+            self._ids[:n] = ids
+            self._rows = {int(student_id): row for row, student_id in enumerate(ids)}
+            self.loaded = True
+
+    def _append(self, student_id, embedding):
+        n = len(self._rows)
+        if n == len(self._matrix):
+            grow = max(n, 16)
+            self._matrix = np.concatenate(
+                [self._matrix, np.empty((grow, self.dim), dtype=np.float32)])
+            self._ids = np.concatenate(
+                [self._ids, np.empty(grow, dtype=np.int64)])
+        self._matrix[n] = embedding
+        self._ids[n] = student_id
+        self._rows[student_id] = n
+
+    def add(self, student_id, embedding):
+        with self._lock:
+            row = self._rows.get(student_id)
+            if row is None:
+                self._append(student_id, embedding)
+            else:
+                self._matrix[row] = embedding
+
+    def remove(self, student_id):
+        with self._lock:
+            row = self._rows.pop(student_id, None)
+            if row is None:
+                return
+            last = len(self._rows)
+            if row != last:
+                # move the last row into the hole to keep the matrix dense
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._rows[int(self._ids[row])] = row
+
+    def search(self, query_embedding, top_k=5):
+        """Return up to top_k (student_id, score) pairs, best first."""
+        with self._lock:
+            n = len(self._rows)
+            if n == 0 or top_k < 1:
+                return []
+
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, SEARCH_CHUNK):
+                end = min(start + SEARCH_CHUNK, n)
+                scores[start:end] = verify.similarities(
+                    self._matrix[start:end], query_embedding)
+
+            k = min(top_k, n)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(int(self._ids[i]), float(scores[i])) for i in best]
+
+
+fingerprint_index = FingerprintIndex()
@@ -0,0 +1,139 @@
+import io
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import cv2
+from PIL import Image
+
+
+IMG_SIZE = 224
+
+# preprocessed prints are keyed by a hash of the file contents, so a print
+# seen before (re-enrollment, retries, training epochs) is not decoded again
+CACHE_SIZE = int(os.getenv("FINGERPRINT_CACHE_SIZE", "256"))
+# optional on-disk cache of the 224x224 tensors, shared between processes
+CACHE_DIR = os.getenv("FINGERPRINT_CACHE_DIR")
+
+
+def read_bytes(source) -> bytes:
+    """Raw file contents of a path, or the given bytes-like object."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def content_key(data) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decode(data) -> np.ndarray:
+    """Encoded image bytes -> (IMG_SIZE, IMG_SIZE, 1) float32 in [0, 1]."""
+    with Image.open(io.BytesIO(data)) as img:
+        # "L" is always 8-bit, 16-bit TIFFs are reduced by PIL here, which
+        # is what the model was trained on
+        gray = np.asarray(img.convert("L"))
+
+    resized = cv2.resize(gray, (IMG_SIZE, IMG_SIZE))
+
+    out = np.empty((IMG_SIZE, IMG_SIZE, 1), dtype=np.float32)
+    # scale the uint8 pixels straight into the float32 output
+    np.multiply(resized, np.float32(1.0 / 255.0), out=out[:, :, 0],
+                dtype=np.float32)
+    return out
+
+
+class PreprocessCache:
+    """LRU of preprocessed prints in memory, backed by .npy files in
+    cache_dir when one is set."""
+
+    def __init__(self, size=CACHE_SIZE, cache_dir=CACHE_DIR):
+        self.size = size
+        self.cache_dir = cache_dir
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return image
+
+        if self.cache_dir:
+            try:
+                image = np.load(self._path(key))
+            except (OSError, ValueError):
+                image = None
+            if image is not None and image.shape == (IMG_SIZE, IMG_SIZE, 1):
+                image.setflags(write=False)
+                self._remember(key, image)
+                with self._lock:
+                    self.hits += 1
+                return image
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, image):
+        image.setflags(write=False)
+        self._remember(key, image)
+
+        if self.cache_dir:
+            # write then rename, so readers never see half a file
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, image)
+                os.replace(tmp, self._path(key))
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def _remember(self, key, image):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._items[key] = image
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+cache = PreprocessCache()
+
+
+def load_image(source) -> np.ndarray:
+    """Preprocessed (IMG_SIZE, IMG_SIZE, 1) float32 print from a path or
+    from in-memory bytes (e.g. an upload). The result is shared through
+    the cache and read-only."""
+    data = read_bytes(source)
+    key = content_key(data)
+
+    image = cache.get(key)
+    if image is None:
+        image = decode(data)
+        cache.put(key, image)
+    return image
+
+
+def load_batch(sources) -> np.ndarray:
+    """(n, IMG_SIZE, IMG_SIZE, 1) float32 batch, filled in place."""
+    batch = np.empty((len(sources), IMG_SIZE, IMG_SIZE, 1), dtype=np.float32)
+    for i, source in enumerate(sources):
+        batch[i] = load_image(source)
+    return batch
@@ -0,0 +1,149 @@
+import os
+import time
+
+import cv2
+import numpy as np
+from imutils import face_utils
+
+# ===================== SETTINGS =====================
+EYE_AR_THRESH = float(os.getenv("CAMERA_EYE_AR_THRESH", "0.20"))
+EYE_AR_CONSEC_FRAMES = int(os.getenv("CAMERA_EYE_AR_FRAMES", "1"))
+# eye landmarks are located on the grayscale frame downscaled by this
+# much; the eye aspect ratio is a ratio, so the scale doesn't change it
+LIVENESS_SCALE = float(os.getenv("CAMERA_LIVENESS_SCALE", "0.5"))
+# faces shorter than this many pixels after downscaling are scored at full
+# resolution instead, there would be too few pixels across the eyes
+LIVENESS_MIN_FACE = int(os.getenv("CAMERA_LIVENESS_MIN_FACE", "80"))
+# an identity's blink state is forgotten once it has been out of view
+# this long
+LIVENESS_TTL_SECONDS = float(os.getenv("CAMERA_LIVENESS_TTL", "10"))
+
+# the 6 points of each eye, left eye first, as indices into the 68
+# landmarks
+EYE_POINTS = np.r_[slice(*face_utils.FACIAL_LANDMARKS_IDXS["left_eye"]),
+                   slice(*face_utils.FACIAL_LANDMARKS_IDXS["right_eye"])]
+
+# ===================== EYE ASPECT RATIO =====================
+
+
+def eye_aspect_ratios(eyes) -> np.ndarray:
+    """Mean eye aspect ratio of both eyes for (n, 12, 2) eye points, as
+    an (n,) array, in one pass over every face."""
+    eyes = np.asarray(eyes, dtype=np.float32).reshape(-1, 2, 6, 2)
+
+    # |p1 - p5| + |p2 - p4| over 2 |p0 - p3|, for every eye at once
+    vertical = np.linalg.norm(
+        eyes[:, :, [1, 2]] - eyes[:, :, [5, 4]], axis=-1).sum(axis=-1)
+    horizontal = np.linalg.norm(eyes[:, :, 0] - eyes[:, :, 3], axis=-1)
+    ratios = vertical / (2.0 * np.maximum(horizontal, 1e-6))
+    return ratios.mean(axis=1)
+
+# ===================== BLINK STATE =====================
+
+
+class BlinkState:
+    """Blink state machine of one identity. open -> closed -> open counts
+    a blink; it starts unknown until the eyes are first seen open, so a
+    face that appears with its eyes shut isn't credited for opening
+    them."""
+
+    UNKNOWN, OPEN, CLOSED = "unknown", "open", "closed"
+
+    def __init__(self, track_id, now):
+        self.track_id = track_id
+        self.state = self.UNKNOWN
+        self.closed_frames = 0
+        self.blinks = 0
+        self.seen_at = now
+
+    def update(self, ear, now):
+        self.seen_at = now
+
+        if ear < EYE_AR_THRESH:
+            if self.state == self.OPEN:
+                self.state = self.CLOSED
+            if self.state == self.CLOSED:
+                self.closed_frames += 1
+            return
+
+        if self.state == self.CLOSED and self.closed_frames >= EYE_AR_CONSEC_FRAMES:
+            self.blinks += 1
+        self.state = self.OPEN
+        self.closed_frames = 0
+
+# ===================== ENGINE =====================
+
+
+class LivenessEngine:
+    """Blink liveness for the faces of one source.
+
+    Eye landmarks are only located for candidate faces: tracks that
+    matched a student and are neither marked nor live yet. Everyone else
+    in view costs nothing. State is kept per identity, and only the face
+    that started it can advance it, so one person blinking never lets
+    another through."""
+
+    def __init__(self, predictor_path, scale=LIVENESS_SCALE,
+                 min_face=LIVENESS_MIN_FACE, ttl=LIVENESS_TTL_SECONDS):
+        import dlib
+
+        self._dlib = dlib
+        self.predictor = dlib.shape_predictor(predictor_path)
+        self.scale = scale
+        self.min_face = min_face
+        self.ttl = ttl
+        self.states = {}
+
+    def _state(self, track):
+        state = self.states.get(track.name)
+        if state is not None and state.track_id == track.id:
+            return state
+        return None
+
+    def is_live(self, track) -> bool:
+        state = self._state(track)
+        return state is not None and state.blinks >= 1
+
+    def _eye_points(self, gray, small, box):
+        top, right, bottom, left = box
+        image, scale = small, self.scale
+        if (bottom - top) * scale < self.min_face:
+            image, scale = gray, 1.0
+
+        shape = self.predictor(image, self._dlib.rectangle(
+            int(left * scale), int(top * scale),
+            int(right * scale), int(bottom * scale)))
+        return [(shape.part(i).x, shape.part(i).y) for i in EYE_POINTS]
+
+    def update(self, gray, tracks):
+        """Advance the blink state of the candidate tracks on one
+        full-resolution grayscale frame."""
+        now = time.monotonic()
+
+        candidates = []
+        for track in tracks:
+            if not track.name or track.marked:
+                continue
+            state = self._state(track)
+            if state is None or state.blinks < 1:
+                candidates.append(track)
+            else:
+                state.seen_at = now
+
+        if candidates:
+            small = gray if self.scale == 1 else cv2.resize(
+                gray, (0, 0), fx=self.scale, fy=self.scale,
+                interpolation=cv2.INTER_AREA)
+            eyes = [self._eye_points(gray, small, track.box)
+                    for track in candidates]
+
+            for track, ear in zip(candidates, eye_aspect_ratios(eyes)):
+                state = self._state(track)
+                if state is None:
+                    # a new face claiming this identity starts over
+                    state = self.states[track.name] = BlinkState(track.id, now)
+                state.update(float(ear), now)
+
+        for name in [name for name, state in self.states.items()
+                     if now - state.seen_at > self.ttl]:
+            del self.states[name]
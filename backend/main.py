@@ -1,23 +1,81 @@
-from verify import verify
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Request
+import time
+
+STARTED_AT = time.perf_counter()
+
+from structured_logging import setup_logging, get_logger
+
+setup_logging()
+logger = get_logger("api")
+
+from verify import embed, load_image, warm_up, model_status, EMBEDDING_DIM
+from verification_service import batch_verifier
+from fingerprint_index import fingerprint_index
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request, Query
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from camera_service import start_camera, stop_camera
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey, Float
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from camera_service import start_camera, stop_camera, camera_status, camera_metrics
+from camera_attendance import camera_attendance
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db, Faculty, Lecture, Students, BiometricTemplate
+from face_gallery import ENCODING_DIM as FACE_ENCODING_DIM
+from biometric_templates import (encode_template, decode_template, load_templates, parse_encoding,
+                                 FACE, FINGERPRINT, FACE_MODEL_ID, FINGERPRINT_MODEL_ID)
+from attendance_writer import attendance_writer, id_cache
+from dashboard_stats import dashboard_stats
+from reports import attendance_page, iter_pages, encode_cursor, decode_cursor, EXPORTERS, EXPORT_FORMATS, MAX_PAGE_SIZE
+from compute_pool import cpu_pool, PoolBusy
+from token_cache import token_cache
+from metrics import registry, http_request_seconds
+import fingerprint_preprocess
+from starlette.concurrency import run_in_threadpool
 
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr
 
-from typing import Optional
+from typing import Optional, List
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import numpy as np
+import threading
 import bcrypt
-from jose import jwt
+from jose import jwt, JWTError
 import uuid
 # pip install fastapi uvicorn sqlalchemy bcrypt python-jose python-multipart email-validator
 
 # -------------------- APP INIT --------------------
 
-app = FastAPI(title="Astitva - Attendance System", version="1.0")
+# load the fingerprint model in the background after startup instead of
+# on the first /verify-fingerprint call
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "1") == "1"
+
+startup_seconds = None
+
+
+def warm_up_models():
+    try:
+        warm_up()
+    except Exception as exc:
+        logger.warning("fingerprint model warm-up failed", extra={"error": str(exc)})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global startup_seconds
+    startup_seconds = time.perf_counter() - STARTED_AT
+    logger.info("API started", extra={"startup_seconds": round(startup_seconds, 3)})
+
+    if WARMUP_MODELS:
+        threading.Thread(target=warm_up_models,
+                         name="model-warmup", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Astitva - Attendance System",
+              version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,19 +85,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# -------------------- DATABASE --------------------
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./attendance.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+# CPU-heavy work goes to cpu_pool; once its queue is full, fail fast
+# instead of letting requests pile up
+@app.exception_handler(PoolBusy)
+async def pool_busy_handler(request: Request, exc: PoolBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, retry shortly"},
+                        headers={"Retry-After": "1"})
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # -------------------- JWT CONFIG --------------------
 
@@ -47,57 +102,11 @@ SECRET_KEY = "super-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# -------------------- FINGERPRINT CONFIG --------------------
 
-# -------------------- MODELS --------------------
-
-class Faculty(Base):
-    __tablename__ = "faculty"
-
-    id = Column(Integer, primary_key=True, index=True)
-    faculty_id = Column(String, unique=True, index=True)
-    full_name = Column(String)
-    department = Column(String)
-    email = Column(String, unique=True, index=True)
-    hashed_password = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-
-class Lecture(Base):
-    __tablename__ = "lectures"
-
-    id = Column(Integer, primary_key=True, index=True)
-    subject_name = Column(String)
-    room = Column(String)
-    start_time = Column(DateTime)
-    end_time = Column(DateTime)
-    is_active = Column(Boolean, default=True)
-
-
-class Attendance(Base):
-    __tablename__ = "attendance"
-
-    id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, ForeignKey("students.id"))
-    lecture_id = Column(Integer, ForeignKey("lectures.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    is_verified = Column(Boolean)
-    confidence_score = Column(Float, default=0.0)
-    status = Column(String, default="verified")
-
-
-class Students(Base):
-    __tablename__ = "students"
-
-    id = Column(Integer, primary_key=True, index=True)
-    student_id = Column(Integer, unique=True, index=True)
-    full_name = Column(String)
-    face_encoding = Column(String, nullable=True)
-    qr_encoding = Column(String, nullable=True)
-    id_card_hash = Column(String, nullable=True)
-    fingerprint_data = Column(String, nullable=True)
-
-
-Base.metadata.create_all(bind=engine)
+VERIFY_THRESHOLD = 0.5
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_IDENTIFY_TOP_K = 50
 
 
 # -------------------- SCHEMAS --------------------
@@ -123,6 +132,10 @@ class AttendanceRequest(BaseModel):
     status: str
 
 
+class AttendanceBatchRequest(BaseModel):
+    records: List[AttendanceRequest]
+
+
 class AddStudent(BaseModel):
     student_id: int
     full_name: str
@@ -136,21 +149,17 @@ class UpdateStudent(BaseModel):
     fingerprint_data: Optional[str] = None
 
 
+class FaceTemplates(BaseModel):
+    encodings: List[List[float]]
+    source: Optional[str] = None
+
+
 class AddLecture(BaseModel):
     subject_name: str
     room: str
     start_time: datetime
     end_time: datetime
     is_active: bool
-# -------------------- DEPENDENCY --------------------
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
 # -------------------- UTILITIES --------------------
@@ -169,36 +178,221 @@ def create_access_token(data: dict):
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# -------------------- LOGGING MIDDLEWARE --------------------
+def decode_token(token: str) -> dict:
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.put(token, claims)
+    return claims
+
+
+def get_current_faculty(token: str = Depends(oauth2_scheme)) -> dict:
+    """Claims of the bearer token; validated tokens are cached until they
+    expire."""
+    try:
+        return decode_token(token)
+    except JWTError:
+        raise HTTPException(401, "Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def fingerprint_templates(student_id: int, db: Session):
+    return db.query(BiometricTemplate).filter(
+        BiometricTemplate.student_id == student_id,
+        BiometricTemplate.modality == FINGERPRINT,
+        BiometricTemplate.model_id == FINGERPRINT_MODEL_ID
+    )
+
+
+def enroll_fingerprint(student: Students, db: Session):
+    embedding = None
+    if student.fingerprint_data:
+        embedding = embed(student.fingerprint_data)
+
+    # the enrolled print replaces any earlier one
+    fingerprint_templates(student.student_id, db).delete()
+
+    if embedding is not None:
+        db.add(BiometricTemplate(
+            student_id=student.student_id,
+            modality=FINGERPRINT,
+            model_id=FINGERPRINT_MODEL_ID,
+            source=student.fingerprint_data,
+            template=encode_template(embedding, FINGERPRINT_MODEL_ID)
+        ))
+    return embedding
+
+
+def get_fingerprint_embedding(student: Students, db: Session):
+    cached = fingerprint_templates(student.student_id, db).filter(
+        BiometricTemplate.source == student.fingerprint_data
+    ).order_by(BiometricTemplate.id.desc()).first()
+
+    if cached:
+        return decode_template(cached.template, FINGERPRINT_MODEL_ID)
+
+    # enrolled before templates were stored, or the print was replaced
+    embedding = enroll_fingerprint(student, db)
+    db.commit()
+    sync_fingerprint_index(student.student_id, embedding)
+    return embedding
+
+
+def sync_fingerprint_index(student_id: int, embedding):
+    if not fingerprint_index.loaded:
+        return
+    if embedding is None:
+        fingerprint_index.remove(student_id)
+    else:
+        fingerprint_index.add(student_id, embedding)
+
+
+def load_fingerprint_index(db: Session):
+    if fingerprint_index.loaded:
+        return
+
+    enrolled = dict(db.query(Students.student_id, Students.fingerprint_data).filter(
+        Students.fingerprint_data.isnot(None)).all())
+
+    # every stored template in one query, decoded as one matrix
+    student_ids, _, sources, matrix = load_templates(
+        db, FINGERPRINT, FINGERPRINT_MODEL_ID, EMBEDDING_DIM)
+
+    # the latest template of each student that matches the current print
+    current = {}
+    for row, (student_id, source) in enumerate(zip(student_ids.tolist(), sources)):
+        if enrolled.get(student_id) == source:
+            current[student_id] = row
+
+    ids = list(current)
+    embeddings = [matrix[list(current.values())]]
+
+    stale = set(enrolled) - set(current)
+    if stale:
+        for student in db.query(Students).filter(Students.student_id.in_(stale)):
+            try:
+                embeddings.append(enroll_fingerprint(student, db)[None])
+                ids.append(student.student_id)
+            except (OSError, ValueError) as exc:
+                logger.warning("skipping fingerprint", extra={
+                    "student_id": student.student_id, "error": str(exc)})
+        db.commit()
+
+    fingerprint_index.load_matrix(np.asarray(ids, dtype=np.int64),
+                                  np.concatenate(embeddings))
+
+
+# -------------------- METRICS --------------------
 
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    print("➡ REQUEST:", request.method, request.url)
-    response = await call_next(request)
-    print("⬅ RESPONSE:", request.method, request.url)
-    return response
+async def observe_requests(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        # label by route template, not raw path, to keep the series bounded
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        http_request_seconds.observe(elapsed, method=request.method,
+                                     route=route, status=status)
+        logger.info("request", extra={
+            "method": request.method, "path": request.url.path,
+            "route": route, "status": status,
+            "duration_ms": round(elapsed * 1000, 3)})
+
+
+@registry.collector
+def runtime_metrics():
+    pool = cpu_pool.stats()
+    image_cache = fingerprint_preprocess.cache
+
+    families = [
+        ("queue_depth", "gauge", "Items waiting in in-process queues", [
+            ({"queue": "attendance_writer"}, attendance_writer.queue.qsize()),
+            ({"queue": "batch_verifier"}, batch_verifier.queue.qsize()),
+            ({"queue": "camera_attendance"}, len(camera_attendance.pending)),
+            ({"queue": "compute_pool"}, pool["queued"]),
+        ]),
+        ("compute_pool_active", "gauge", "Compute pool tasks running", [
+            ({}, pool["active"]),
+        ]),
+        ("compute_pool_tasks_total", "counter", "Compute pool tasks by outcome", [
+            ({"outcome": "completed"}, pool["completed"]),
+            ({"outcome": "failed"}, pool["failed"]),
+            ({"outcome": "rejected"}, pool["rejected"]),
+        ]),
+        ("cache_hits_total", "counter", "Cache hits", [
+            ({"cache": "token"}, token_cache.hits),
+            ({"cache": "fingerprint_image"}, image_cache.hits),
+        ]),
+        ("cache_misses_total", "counter", "Cache misses", [
+            ({"cache": "token"}, token_cache.misses),
+            ({"cache": "fingerprint_image"}, image_cache.misses),
+        ]),
+    ]
+
+    # reported by the camera process every CAMERA_STATS_SECONDS
+    camera = camera_metrics()
+    families += [
+        ("camera_fps", "gauge", "Frames processed per second", [
+            ({"source": source}, stats["fps"]) for source, stats in camera.items()
+        ]),
+        ("camera_frames_total", "counter", "Frames processed", [
+            ({"source": source}, stats["frames"]) for source, stats in camera.items()
+        ]),
+        ("camera_keyframes_total", "counter", "Frames given a full detection", [
+            ({"source": source}, stats["keyframes"]) for source, stats in camera.items()
+        ]),
+        ("camera_frames_dropped_total", "counter", "Stale frames dropped by capture", [
+            ({"source": source}, stats["dropped"]) for source, stats in camera.items()
+        ]),
+        ("camera_frame_latency_seconds_total", "counter", "Capture-to-result time summed over frames", [
+            ({"source": source}, stats["latency"][1]) for source, stats in camera.items()
+        ]),
+        ("camera_stage_seconds_total", "counter", "Time spent per pipeline stage", [
+            ({"source": source, "stage": stage}, totals[1])
+            for source, stats in camera.items()
+            for stage, totals in stats["stages"].items()
+        ]),
+        ("camera_stage_runs_total", "counter", "Pipeline stage executions", [
+            ({"source": source, "stage": stage}, totals[0])
+            for source, stats in camera.items()
+            for stage, totals in stats["stages"].items()
+        ]),
+    ]
+    return families
 
 
 # -------------------- ENDPOINTS --------------------
 
 @app.post("/camera/start")
-def start():
-    start_camera()
-    return {"status": "camera started"}
+def start(source_id: Optional[str] = None):
+    try:
+        start_camera(source_id)
+    except KeyError:
+        raise HTTPException(404, "Camera source not found")
+    return {"status": "camera started", "source_id": source_id}
 
 
 @app.post("/camera/stop")
-def stop():
-    stop_camera()
-    return {"status": "camera stopped"}
+def stop(source_id: Optional[str] = None):
+    try:
+        stop_camera(source_id)
+    except KeyError:
+        raise HTTPException(404, "Camera source not found")
+    return {"status": "camera stopped", "source_id": source_id}
 
 
 @app.post("/add-student")
-def add_student(student: AddStudent, db: Session = Depends(get_db)):
-    exists = db.query(Students).filter(
+async def add_student(student: AddStudent, db: AsyncSession = Depends(get_async_db)):
+    exists = (await db.execute(select(Students.id).where(
         (Students.full_name == student.full_name) |
         (Students.student_id == student.student_id)
-    ).first()
+    ).limit(1))).first()
 
     if exists:
         raise HTTPException(400, "Student already exists")
@@ -208,8 +402,8 @@ def add_student(student: AddStudent, db: Session = Depends(get_db)):
         student_id=student.student_id,
     )
     db.add(new_student)
-    db.commit()
-    db.refresh(new_student)
+    await db.commit()
+    id_cache.remember_student(new_student.student_id, new_student.full_name)
 
 
 @app.patch("/students/{student_id}")
@@ -227,23 +421,92 @@ def update_student(
 
     update_data = data.dict(exclude_unset=True)
 
+    # a face encoding is stored as a template, replacing the student's
+    # face samples, not as text on the student
+    face_encoding = update_data.pop("face_encoding", None)
+    if face_encoding is not None:
+        try:
+            encoding = parse_encoding(face_encoding)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+        db.query(BiometricTemplate).filter(
+            BiometricTemplate.student_id == student_id,
+            BiometricTemplate.modality == FACE
+        ).delete()
+        db.add(BiometricTemplate(
+            student_id=student_id,
+            modality=FACE,
+            model_id=FACE_MODEL_ID,
+            source="api",
+            template=encode_template(encoding, FACE_MODEL_ID)
+        ))
+
     for key, value in update_data.items():
         setattr(student, key, value)
 
+    embedding = None
+    if "fingerprint_data" in update_data:
+        try:
+            embedding = enroll_fingerprint(student, db)
+        except (OSError, ValueError):
+            # nothing is stored when the new print can't be embedded
+            db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Fingerprint image unreadable")
+
     db.commit()
     db.refresh(student)
 
+    if "full_name" in update_data:
+        id_cache.remember_student(student.student_id, student.full_name)
+
+    if "fingerprint_data" in update_data:
+        sync_fingerprint_index(student.student_id, embedding)
+
     return {
         "message": "Student updated successfully",
         "student_id": student.student_id,
-        "updated_fields": list(update_data.keys())
+        "updated_fields": list(update_data.keys()) + (
+            ["face_encoding"] if face_encoding is not None else [])
     }
 
 
+@app.post("/students/{student_id}/face-templates")
+def add_face_templates(student_id: int, data: FaceTemplates, db: Session = Depends(get_db)):
+    exists = db.query(Students.id).filter(
+        Students.student_id == student_id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    try:
+        encodings = np.asarray(data.encodings, dtype=np.float32)
+    except ValueError:
+        # rows of different lengths
+        encodings = np.empty(0, dtype=np.float32)
+    if encodings.ndim != 2 or encodings.shape[1] != FACE_ENCODING_DIM:
+        raise HTTPException(
+            status_code=400, detail=f"Expected lists of {FACE_ENCODING_DIM} values")
+
+    db.add_all([
+        BiometricTemplate(
+            student_id=student_id,
+            modality=FACE,
+            model_id=FACE_MODEL_ID,
+            source=data.source,
+            template=encode_template(encoding, FACE_MODEL_ID)
+        )
+        for encoding in encodings
+    ])
+    db.commit()
+
+    return {"student_id": student_id, "added": len(encodings)}
+
+
 @app.post("/add-lecture")
-def add_lecture(lecture: AddLecture, db: Session = Depends(get_db)):
-    exists = db.query(Lecture).filter(
-        Lecture.subject_name == lecture.subject_name).first()
+async def add_lecture(lecture: AddLecture, db: AsyncSession = Depends(get_async_db)):
+    exists = (await db.execute(select(Lecture.id).where(
+        Lecture.subject_name == lecture.subject_name).limit(1))).first()
     if exists:
         raise HTTPException(400, "Lecture already exists")
 
@@ -255,15 +518,13 @@ def add_lecture(lecture: AddLecture, db: Session = Depends(get_db)):
         is_active=lecture.is_active
     )
     db.add(new_lecture)
-    db.commit()
-    db.refresh(new_lecture)
+    await db.commit()
+    id_cache.remember_lecture(new_lecture.id)
 
     return {"message": "lecture added successfully"}
 
 
-@app.post("/verify-fingerprint")
-def verify_fingerprint(student_id: int, query_path: str, db: Session = Depends(get_db)):
-
+def enrolled_embedding(student_id: int, db: Session):
     student = db.query(Students).filter(
         Students.student_id == student_id
     ).first()
@@ -271,26 +532,181 @@ def verify_fingerprint(student_id: int, query_path: str, db: Session = Depends(g
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    enrolled_path = student.fingerprint_data
+    if not student.fingerprint_data:
+        raise HTTPException(
+            status_code=400, detail="Fingerprint not enrolled")
 
-    is_verified: bool = verify(enrolled_path, query_path)
-    if is_verified:
-        return {
-            "200": "Attendance is valid"
-        }
-    else:
-        return {
-            "200": "Attendance is not valid"
-        }
+    try:
+        return get_fingerprint_embedding(student, db)
+    except (OSError, ValueError):
+        # the enrolled print is missing or broken on the server; the
+        # message would name the file, so it isn't passed on
+        raise HTTPException(
+            status_code=409, detail="Enrolled fingerprint unreadable")
+
+
+def check_upload(data: bytes):
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty fingerprint image")
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Fingerprint image too large")
+
+
+async def decode_upload(data: bytes):
+    check_upload(data)
+    try:
+        # decoded straight from the request bytes, nothing touches the disk
+        return await cpu_pool.run(load_image, data)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid fingerprint image")
+
+
+async def verify_upload(student_id: int, data: bytes, db: Session):
+    check_upload(data)
+    enrolled = await run_in_threadpool(enrolled_embedding, student_id, db)
+    query_image = await decode_upload(data)
+
+    score = await asyncio.wrap_future(batch_verifier.submit(enrolled, query_image))
+
+    is_verified = score >= VERIFY_THRESHOLD
+    return {
+        "student_id": student_id,
+        "score": score,
+        "threshold": VERIFY_THRESHOLD,
+        "is_verified": is_verified,
+        "decision": "valid" if is_verified else "not valid"
+    }
+
+
+@app.post("/verify-fingerprint")
+async def verify_fingerprint(student_id: int = Form(...), file: UploadFile = File(...),
+                             db: Session = Depends(get_db)):
+    """Multipart upload: `student_id` field plus the print as `file`."""
+    return await verify_upload(student_id, await file.read(MAX_UPLOAD_BYTES + 1), db)
+
+
+@app.post("/verify-fingerprint/{student_id}/raw")
+async def verify_fingerprint_raw(student_id: int, request: Request,
+                                 db: Session = Depends(get_db)):
+    """The print as the raw request body, e.g. application/octet-stream."""
+    if int(request.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Fingerprint image too large")
+
+    return await verify_upload(student_id, await request.body(), db)
+
+
+def verify_batch(student_ids: List[int], uploads: List[bytes], db: Session):
+    students = {
+        s.student_id: s for s in
+        db.query(Students).filter(Students.student_id.in_(set(student_ids))).all()
+    }
+
+    pending = []
+    results = []
+
+    for student_id, data in zip(student_ids, uploads):
+        result = {"student_id": student_id}
+        results.append(result)
+
+        if not data:
+            result["error"] = "Empty fingerprint image"
+            continue
+        if len(data) > MAX_UPLOAD_BYTES:
+            result["error"] = "Fingerprint image too large"
+            continue
+
+        student = students.get(student_id)
+        if not student:
+            result["error"] = "Student not found"
+            continue
+        if not student.fingerprint_data:
+            result["error"] = "Fingerprint not enrolled"
+            continue
+
+        try:
+            enrolled = get_fingerprint_embedding(student, db)
+        except (OSError, ValueError):
+            # the message would name the enrolled file on the server
+            result["error"] = "Enrolled fingerprint unreadable"
+            continue
+
+        # decode every query print in parallel on the compute pool
+        pending.append((result, enrolled, cpu_pool.submit(load_image, data)))
+
+    scoring = []
+    for result, enrolled, decoding in pending:
+        try:
+            query_image = decoding.result()
+        except (OSError, ValueError):
+            result["error"] = "Invalid fingerprint image"
+            continue
+        scoring.append((result, batch_verifier.submit(enrolled, query_image)))
+
+    for result, future in scoring:
+        try:
+            score = future.result()
+        except Exception as exc:
+            result["error"] = str(exc)
+            continue
+        result["score"] = score
+        result["is_verified"] = score >= VERIFY_THRESHOLD
+
+    return {"results": results}
+
+
+@app.post("/verify-fingerprint/batch")
+async def verify_fingerprint_batch(student_ids: List[int] = Form(...),
+                                   files: List[UploadFile] = File(...),
+                                   db: Session = Depends(get_db)):
+    """Multipart: repeated `student_ids` fields and `files` parts, paired
+    in order."""
+    if len(student_ids) != len(files):
+        raise HTTPException(
+            status_code=400, detail="Expected one file per student id")
+
+    uploads = [await file.read(MAX_UPLOAD_BYTES + 1) for file in files]
+    return await run_in_threadpool(verify_batch, student_ids, uploads, db)
+
+
+def student_names(student_ids, db: Session):
+    return dict(db.query(Students.student_id, Students.full_name).filter(
+        Students.student_id.in_(student_ids)).all())
+
+
+@app.post("/identify-fingerprint")
+async def identify_fingerprint(file: UploadFile = File(...),
+                               top_k: int = Query(5, ge=1, le=MAX_IDENTIFY_TOP_K),
+                               db: Session = Depends(get_db)):
+
+    query_image = await decode_upload(await file.read(MAX_UPLOAD_BYTES + 1))
+    await run_in_threadpool(load_fingerprint_index, db)
+
+    query_embedding = await asyncio.wrap_future(batch_verifier.embed(query_image))
+    matches = fingerprint_index.search(query_embedding, top_k)
+
+    names = await run_in_threadpool(
+        student_names, [student_id for student_id, _ in matches], db)
+
+    return {
+        "matches": [
+            {
+                "student_id": student_id,
+                "full_name": names.get(student_id),
+                "score": score,
+                "is_verified": score >= VERIFY_THRESHOLD
+            }
+            for student_id, score in matches
+        ]
+    }
 
 
 @app.post("/register")
-def register_faculty(faculty: FacultyCreate, db: Session = Depends(get_db)):
+async def register_faculty(faculty: FacultyCreate, db: AsyncSession = Depends(get_async_db)):
 
-    exists = db.query(Faculty).filter(
+    exists = (await db.execute(select(Faculty.id).where(
         (Faculty.email == faculty.email) |
         (Faculty.faculty_id == faculty.faculty_id)
-    ).first()
+    ).limit(1))).first()
 
     if exists:
         raise HTTPException(400, "Faculty already exists")
@@ -300,25 +716,27 @@ def register_faculty(faculty: FacultyCreate, db: Session = Depends(get_db)):
         faculty_id=faculty.faculty_id,
         department=faculty.department,
         email=faculty.email,
-        hashed_password=hash_password(faculty.password)
+        hashed_password=await cpu_pool.run(hash_password, faculty.password)
     )
 
     db.add(new_faculty)
-    db.commit()
-    db.refresh(new_faculty)
+    await db.commit()
 
     return {"message": "Student registered successfully"}
 
 
 @app.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
 
-    faculty = db.query(Faculty).filter(Faculty.email == data.email).first()
+    faculty = (await db.execute(
+        select(Faculty).where(Faculty.email == data.email)
+    )).scalars().first()
 
     if not faculty:
         raise HTTPException(401, "Invalid credentials")
 
-    if not verify_password(data.password, faculty.hashed_password):
+    # bcrypt is deliberately slow, keep it off the request threadpool
+    if not await cpu_pool.run(verify_password, data.password, faculty.hashed_password):
         raise HTTPException(401, "Invalid credentials")
 
     token = create_access_token({"sub": faculty.email})
@@ -330,50 +748,171 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 
+@app.get("/me")
+def me(claims: dict = Depends(get_current_faculty)):
+    return {"email": claims["sub"], "expires_at": claims["exp"]}
+
+
+async def validate_attendance(records):
+    students, lectures = id_cache.missing(records)
+    if students or lectures:
+        await run_in_threadpool(id_cache.load, students, lectures)
+    return id_cache.check(records)
+
+
 @app.post("/mark-attendance")
-def mark_attendance(req: AttendanceRequest, db: Session = Depends(get_db)):
+async def mark_attendance(req: AttendanceRequest):
 
-    student = db.query(Students).filter(
-        Students.student_id == req.student_id).first()
-    lecture = db.query(Lecture).filter(
-        Lecture.id == req.lecture_id).first()
+    record = req.dict()
+    record["timestamp"] = datetime.utcnow()
 
-    if not student:
-        raise HTTPException(404, "Student not found")
-    if not lecture:
-        raise HTTPException(404, "Lecture not found")
-
-    attendance = Attendance(
-        student_id=req.student_id,
-        lecture_id=req.lecture_id,
-        is_verified=req.is_verified,
-        confidence_score=req.confidence_score,
-        status=req.status
-    )
+    errors, names = await validate_attendance([record])
+    if errors[0]:
+        raise HTTPException(404, errors[0])
 
-    db.add(attendance)
-    db.commit()
+    # returns once the batch holding this row is committed
+    await asyncio.wrap_future(attendance_writer.submit([record]))
 
     return {
         "message": "Attendance marked",
-        "student": student.full_name
+        "student": names[0]
+    }
+
+
+@app.post("/mark-attendance/batch")
+async def mark_attendance_batch(req: AttendanceBatchRequest):
+
+    now = datetime.utcnow()
+    records = [dict(r.dict(), timestamp=now) for r in req.records]
+
+    errors, _ = await validate_attendance(records)
+    valid = [r for r, error in zip(records, errors) if error is None]
+
+    if valid:
+        await asyncio.wrap_future(attendance_writer.submit(valid))
+
+    return {
+        "marked": len(valid),
+        "errors": [
+            {"index": i, "detail": error}
+            for i, error in enumerate(errors) if error
+        ]
     }
 
 
 @app.get("/dashboard")
-def dashboard(db: Session = Depends(get_db)):
+async def dashboard():
+
+    # served from memory; only an expired snapshot touches the database
+    if dashboard_stats.is_fresh():
+        return dashboard_stats.snapshot()
+    return await run_in_threadpool(dashboard_stats.snapshot)
+
+
+@app.get("/reports/attendance")
+def attendance_report(
+    lecture_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-    students = db.query(Students).count()
-    faculty = db.query(Faculty).count()
-    attendance = db.query(Attendance).count()
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+    rows = attendance_page(db, lecture_id, student_id, start, end, after, limit)
 
     return {
-        "total_faculty": faculty,
-        "total_students": students,
-        "total_attendance": attendance
+        "items": rows,
+        "next_cursor": encode_cursor(rows[-1]) if len(rows) == limit else None
     }
 
 
+@app.get("/reports/lectures/{lecture_id}/attendance")
+def lecture_attendance_report(
+    lecture_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    return attendance_report(lecture_id=lecture_id, cursor=cursor, limit=limit, db=db)
+
+
+@app.get("/reports/students/{student_id}/attendance")
+def student_attendance_report(
+    student_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    return attendance_report(student_id=student_id, start=start, end=end,
+                             cursor=cursor, limit=limit, db=db)
+
+
+@app.get("/reports/attendance/export")
+def export_attendance(
+    format: str = "csv",
+    lecture_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    if format not in EXPORTERS:
+        raise HTTPException(400, f"Unsupported format: {format}")
+
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(400, "Parquet export requires pyarrow")
+
+    filters = {
+        "lecture_id": lecture_id,
+        "student_id": student_id,
+        "start": start,
+        "end": end
+    }
+
+    # rows are read and encoded page by page while the response streams
+    return StreamingResponse(
+        EXPORTERS[format](iter_pages(filters)),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="attendance.{format}"'
+        }
+    )
+
+
+@app.get("/ready")
+def ready():
+    return {
+        "startup_seconds": startup_seconds,
+        "models": {
+            "fingerprint": model_status(),
+            "camera": camera_status()
+        },
+        "fingerprint_index": {
+            "loaded": fingerprint_index.loaded,
+            "size": len(fingerprint_index)
+        },
+        "compute": cpu_pool.stats()
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def root():
     return {
@@ -0,0 +1,211 @@
+import time
+import threading
+from bisect import bisect_left
+
+# -------------------- SETTINGS --------------------
+
+# seconds; covers cached reads (~1 ms) up to bcrypt and model calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+# -------------------- METRICS --------------------
+# a small Prometheus text-format registry; metrics live in this process
+# only, the camera process reports its numbers over its event queue and
+# they are exported through a collector
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"'
+                          for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}",
+                f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, key)} {value}"
+                for key, value in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (+Inf last), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            items = [(key, list(counts), total)
+                     for key, (counts, total) in self._values.items()]
+
+        lines = []
+        names = self.label_names + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register fn() -> [(name, type, help, [(labels dict, value)])],
+        read at scrape time; for values owned by someone else, such as
+        queue sizes. Usable as a decorator."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            samples = metric.render()
+            if samples:
+                lines += metric.header() + samples
+
+        for fn in self.collectors:
+            try:
+                families = fn()
+            except Exception:
+                continue
+            for name, type, help, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+                lines += [f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}"
+                          for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# -------------------- SHARED METRICS --------------------
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status"))
+
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds", "Database statement latency",
+    ("operation",))
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Database statements that raised",
+    ("operation",))
+
+inference_seconds = registry.histogram(
+    "fingerprint_inference_duration_seconds",
+    "Fingerprint embedder call latency, per batch")
+inference_batch_size = registry.histogram(
+    "fingerprint_inference_batch_size",
+    "Prints embedded per model call", buckets=BATCH_BUCKETS)
+
+
+def instrument_engine(engine):
+    """Time every statement run on a (sync) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    def operation(statement):
+        words = statement.split(None, 1)
+        return words[0].upper() if words else "OTHER"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_seconds.observe(time.perf_counter() - started,
+                                 operation=operation(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def error(context):
+        stack = context.connection.info.get("query_started") if context.connection else None
+        if stack:
+            stack.pop()
+        db_query_errors.inc(operation=operation(context.statement or ""))
@@ -0,0 +1,159 @@
+from datetime import datetime
+
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, select, text, inspect
+
+from structured_logging import get_logger
+
+logger = get_logger("migrations")
+
+# -------------------- MIGRATIONS --------------------
+# Base.metadata.create_all only creates missing tables, so anything that
+# changes an existing table (indexes, constraints, columns) goes here as a
+# numbered step. Every step runs once, in order, inside a transaction, and
+# must also be safe on a fresh database that create_all just built.
+
+version_table = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime),
+)
+
+
+def attendance_indexes(conn, metadata):
+    attendance = metadata.tables["attendance"]
+
+    # keep one mark per (student, lecture) so the unique index can be
+    # built, the way the upsert of new writes would have left it: the
+    # latest row's status columns (UPSERT_COLUMNS), the first timestamp
+    conn.execute(text(
+        "UPDATE attendance SET timestamp = COALESCE(("
+        " SELECT MIN(earlier.timestamp) FROM attendance earlier"
+        " WHERE earlier.student_id = attendance.student_id"
+        " AND earlier.lecture_id = attendance.lecture_id), timestamp)"
+        " WHERE id IN ("
+        " SELECT MAX(id) FROM attendance GROUP BY student_id, lecture_id"
+        " HAVING COUNT(*) > 1)"
+    ))
+    conn.execute(text(
+        "DELETE FROM attendance WHERE id NOT IN ("
+        " SELECT MAX(id) FROM attendance GROUP BY student_id, lecture_id)"
+    ))
+
+    for index in attendance.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def biometric_templates(conn, metadata):
+    import numpy as np
+    from biometric_templates import (encode_template, parse_encoding, FACE,
+                                     FINGERPRINT, FACE_MODEL_ID, FINGERPRINT_MODEL_ID)
+
+    templates = metadata.tables["biometric_templates"]
+    templates.create(conn, checkfirst=True)
+    rows = []
+
+    # cached fingerprint embeddings (raw float32 bytes)
+    if inspect(conn).has_table("fingerprint_embeddings"):
+        for student_id, source_path, embedding, updated_at in conn.execute(text(
+                "SELECT student_id, source_path, embedding, updated_at "
+                "FROM fingerprint_embeddings WHERE embedding IS NOT NULL")):
+            rows.append({
+                "student_id": student_id,
+                "modality": FINGERPRINT,
+                "model_id": FINGERPRINT_MODEL_ID,
+                "source": source_path,
+                "template": encode_template(
+                    np.frombuffer(embedding, dtype=np.float32), FINGERPRINT_MODEL_ID),
+                "created_at": updated_at or datetime.utcnow(),
+            })
+        conn.execute(text("DROP TABLE fingerprint_embeddings"))
+
+    # face encodings stored as text on the student
+    for student_id, face_encoding in conn.execute(text(
+            "SELECT student_id, face_encoding FROM students "
+            "WHERE face_encoding IS NOT NULL")):
+        try:
+            encoding = parse_encoding(face_encoding)
+        except ValueError as exc:
+            logger.warning("skipping face encoding", extra={
+                "student_id": student_id, "error": str(exc)})
+            continue
+        rows.append({
+            "student_id": student_id,
+            "modality": FACE,
+            "model_id": FACE_MODEL_ID,
+            "source": "students.face_encoding",
+            "template": encode_template(encoding, FACE_MODEL_ID),
+            "created_at": datetime.utcnow(),
+        })
+
+    if rows:
+        conn.execute(templates.insert(), rows)
+
+
+def attendance_student_fk(conn, metadata):
+    # SQLite doesn't enforce foreign keys here (PRAGMA foreign_keys is
+    # off) and can only change one by rebuilding the table, so only the
+    # fresh tables create_all builds get the corrected declaration
+    if conn.dialect.name == "sqlite":
+        return
+
+    foreign_keys = inspect(conn).get_foreign_keys("attendance")
+    for fk in foreign_keys:
+        if (fk["referred_table"] == "students"
+                and fk["referred_columns"] == ["id"]):
+            conn.execute(text(
+                f'ALTER TABLE attendance DROP CONSTRAINT "{fk["name"]}"'))
+
+    if any(fk["referred_table"] == "students"
+           and fk["referred_columns"] == ["student_id"] for fk in foreign_keys):
+        return
+
+    # NOT VALID: enforced for new writes without failing on old rows that
+    # never matched students.id either
+    not_valid = " NOT VALID" if conn.dialect.name == "postgresql" else ""
+    conn.execute(text(
+        "ALTER TABLE attendance ADD CONSTRAINT fk_attendance_student "
+        "FOREIGN KEY (student_id) REFERENCES students (student_id)" + not_valid))
+
+
+MIGRATIONS = [
+    (1, "attendance indexes and unique (student_id, lecture_id)",
+     attendance_indexes),
+    (2, "binary biometric templates from fingerprint_embeddings and "
+        "students.face_encoding", biometric_templates),
+    (3, "attendance.student_id references students.student_id",
+     attendance_student_fk),
+]
+
+
+def migrate(engine, metadata):
+    version_table.create(engine, checkfirst=True)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(select(version_table.c.version)).scalars())
+
+    for version, description, step in MIGRATIONS:
+        if version in applied:
+            continue
+
+        with engine.begin() as conn:
+            step(conn, metadata)
+            conn.execute(version_table.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+        logger.info("migration applied",
+                    extra={"version": version, "description": description})
+
+
+if __name__ == "__main__":
+    # importing database runs pending migrations on its engine
+    import database
+
+    with database.engine.connect() as conn:
+        for version, description, applied_at in conn.execute(
+                select(version_table).order_by(version_table.c.version)):
+            print(version, applied_at, description)
@@ -0,0 +1,171 @@
+import io
+import csv
+import json
+import base64
+from datetime import datetime
+
+from sqlalchemy import select, and_, or_
+
+from database import SessionLocal, Attendance, Students, Lecture
+
+# -------------------- SETTINGS --------------------
+
+EXPORT_PAGE_SIZE = 2000
+MAX_PAGE_SIZE = 1000
+
+COLUMNS = ["id", "student_id", "full_name", "lecture_id", "subject_name",
+           "timestamp", "is_verified", "confidence_score", "status"]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# -------------------- KEYSET PAGINATION --------------------
+# rows are ordered by (timestamp, id); a cursor is the last row's pair, so
+# every page is an index range scan no matter how deep into the history
+
+def encode_cursor(row) -> str:
+    raw = f"{row['timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(
+            cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def attendance_page(db, lecture_id=None, student_id=None, start=None,
+                    end=None, after=None, limit=MAX_PAGE_SIZE):
+    query = (
+        select(Attendance.id, Attendance.student_id, Students.full_name,
+               Attendance.lecture_id, Lecture.subject_name,
+               Attendance.timestamp, Attendance.is_verified,
+               Attendance.confidence_score, Attendance.status)
+        .outerjoin(Students, Students.student_id == Attendance.student_id)
+        .outerjoin(Lecture, Lecture.id == Attendance.lecture_id)
+    )
+
+    if lecture_id is not None:
+        query = query.where(Attendance.lecture_id == lecture_id)
+    if student_id is not None:
+        query = query.where(Attendance.student_id == student_id)
+    if start is not None:
+        query = query.where(Attendance.timestamp >= start)
+    if end is not None:
+        query = query.where(Attendance.timestamp < end)
+    if after is not None:
+        timestamp, row_id = after
+        query = query.where(or_(
+            Attendance.timestamp > timestamp,
+            and_(Attendance.timestamp == timestamp, Attendance.id > row_id)
+        ))
+
+    query = query.order_by(Attendance.timestamp, Attendance.id).limit(limit)
+    return [dict(row._mapping) for row in db.execute(query)]
+
+
+def iter_pages(filters, page_size=EXPORT_PAGE_SIZE, session_factory=SessionLocal):
+    """Yield the whole result set one page at a time, with a short-lived
+    session per page, so memory stays flat however many rows match."""
+    after = None
+    while True:
+        db = session_factory()
+        try:
+            rows = attendance_page(db, after=after, limit=page_size, **filters)
+        finally:
+            db.close()
+
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        after = (rows[-1]["timestamp"], rows[-1]["id"])
+
+
+# -------------------- EXPORTS --------------------
+
+def export_csv(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+
+    for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_ndjson(pages):
+    for rows in pages:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back out in chunks."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_parquet(pages):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("student_id", pa.int64()),
+        ("full_name", pa.string()),
+        ("lecture_id", pa.int64()),
+        ("subject_name", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("is_verified", pa.bool_()),
+        ("confidence_score", pa.float64()),
+        ("status", pa.string()),
+    ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    # one row group per page
+    for rows in pages:
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+EXPORTERS = {
+    "csv": export_csv,
+    "ndjson": export_ndjson,
+    "parquet": export_parquet,
+}
@@ -0,0 +1,50 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# -------------------- SETTINGS --------------------
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+
+# -------------------- CACHE --------------------
+
+class TokenCache:
+    """Claims of recently validated tokens, kept until the token expires,
+    so an authenticated client's requests after the first skip the JWT
+    signature check."""
+
+    def __init__(self, size=TOKEN_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        now = time.time()
+        with self._lock:
+            item = self._items.get(token)
+            if item is not None:
+                claims, expires_at = item
+                if expires_at > now:
+                    self._items.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                del self._items[token]
+            self.misses += 1
+        return None
+
+    def put(self, token: str, claims: dict):
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return
+        with self._lock:
+            self._items[token] = (claims, float(expires_at))
+            self._items.move_to_end(token)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+token_cache = TokenCache()
@@ -1,13 +1,13 @@
 import os
-import cv2
 import numpy as np
-from PIL import Image
 import random
 import tensorflow as tf
 from tensorflow.keras import layers, Model
 from tensorflow.keras.models import load_model
 
-IMG_SIZE = 224
+from fingerprint_preprocess import IMG_SIZE, load_image
+from fingerprint_export import export_tflite, export_head, dataset_paths, group_by_finger
+from verify import TFLITE_PATH, HEAD_PATH
 
 
 class L1Distance(layers.Layer):
@@ -16,46 +16,94 @@ class L1Distance(layers.Layer):
         return tf.abs(x - y)
 
 
-def load_image(path):
-    img = Image.open(path).convert("L")
-    img = np.array(img)
-
-    # normalize 16-bit TIFF
-    if img.dtype != np.uint8:
-        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
-        img = img.astype(np.uint8)
-
-    img = cv2.resize(img, (IMG_SIZE, IMG_SIZE))
-    img = img / 255.0
-    img = np.expand_dims(img, axis=-1)
-    return img
-
-
-def generate_pairs(folder):
-    files = [f for f in os.listdir(folder) if f.endswith(".tif")]
-    labels = {}
-
-    for f in files:
-        person_id = f.split("_")[0]
-        labels.setdefault(person_id, []).append(f)
-
+DATA_FOLDER = "fingerprint_data"
+BATCH_SIZE = 8
+EPOCHS = 15
+# impostor pairs drawn per epoch, fresh every epoch; defaults to as many as
+# there are genuine pairs
+NEGATIVES_PER_EPOCH = int(os.getenv("TRAIN_NEGATIVES_PER_EPOCH", "0"))
+# share of people held out for validation, all of their fingers at once
+VALIDATION_SPLIT = 0.2
+# every unique print is decoded once into this file and memory-mapped, so
+# pairs never copy or re-decode images and the set need not fit in RAM
+IMAGE_CACHE = os.path.join(".fingerprint_cache", "train_images.npy")
+SEED = 42
+
+
+def decode_all(paths, cache_path=IMAGE_CACHE):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    shape = (len(paths), IMG_SIZE, IMG_SIZE, 1)
+
+    index_path = cache_path + ".txt"
+    if os.path.exists(cache_path) and os.path.exists(index_path):
+        with open(index_path) as f:
+            if f.read().splitlines() == paths:
+                images = np.load(cache_path, mmap_mode="r")
+                if images.shape == shape:
+                    return images
+
+    images = np.lib.format.open_memmap(
+        cache_path, mode="w+", dtype=np.float32, shape=shape)
+    for i, path in enumerate(paths):
+        images[i] = load_image(path)
+    images.flush()
+    with open(index_path, "w") as f:
+        f.write("\n".join(paths))
+
+    return np.load(cache_path, mmap_mode="r")
+
+
+def genuine_pairs(groups):
+    return [(a, b) for indices in groups.values()
+            for a, b in zip(indices, indices[1:])]
+
+
+def impostor_pairs(groups, count, rng):
+    fingers = list(groups)
+    if len(fingers) < 2:
+        raise ValueError("Impostor pairs need prints of at least two fingers")
     pairs = []
-    targets = []
-
-    # Genuine pairs
-    for person, imgs in labels.items():
-        for i in range(len(imgs) - 1):
-            pairs.append((imgs[i], imgs[i+1]))
-            targets.append(1)
-
-    # Impostor pairs
-    persons = list(labels.keys())
-    for _ in range(len(pairs)):
-        p1, p2 = random.sample(persons, 2)
-        pairs.append((labels[p1][0], labels[p2][0]))
-        targets.append(0)
-
-    return pairs, targets
+    for _ in range(count):
+        f1, f2 = rng.sample(fingers, 2)
+        pairs.append((rng.choice(groups[f1]), rng.choice(groups[f2])))
+    return pairs
+
+
+def pair_dataset(images, groups, negatives, shuffle, seed=SEED):
+    """tf.data pipeline of ((image_a, image_b), label) batches. Pairs are
+    index pairs generated on the fly; the generator runs again for every
+    epoch, so each epoch sees new impostors when shuffle is on."""
+    genuine = genuine_pairs(groups)
+    negatives = negatives or len(genuine)
+    rng = random.Random(seed)
+
+    def epoch():
+        pair_rng = rng if shuffle else random.Random(seed)
+        pairs = ([(a, b, 1.0) for a, b in genuine] +
+                 [(a, b, 0.0) for a, b in impostor_pairs(groups, negatives, pair_rng)])
+        if shuffle:
+            pair_rng.shuffle(pairs)
+        yield from pairs
+
+    def gather(a, b):
+        # one batch at a time is copied out of the memmap
+        return images[a], images[b]
+
+    def load(a, b, label):
+        x1, x2 = tf.numpy_function(gather, [a, b], [tf.float32, tf.float32])
+        x1.set_shape([None, IMG_SIZE, IMG_SIZE, 1])
+        x2.set_shape([None, IMG_SIZE, IMG_SIZE, 1])
+        return (x1, x2), label
+
+    dataset = tf.data.Dataset.from_generator(
+        epoch,
+        output_signature=(tf.TensorSpec((), tf.int64),
+                          tf.TensorSpec((), tf.int64),
+                          tf.TensorSpec((), tf.float32)))
+    return (dataset
+            .batch(BATCH_SIZE)
+            .map(load, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
 
 
 def build_base_cnn():
@@ -89,28 +137,44 @@ model.compile(
     metrics=["accuracy"]
 )
 
-pairs, labels = generate_pairs("fingerprint_data")
+paths = dataset_paths(DATA_FOLDER)
+images = decode_all(paths)
 
-X1, X2, Y = [], [], []
+groups = group_by_finger(paths)
+persons = sorted({finger.split("_")[0] for finger in groups})
+random.Random(SEED).shuffle(persons)
 
-for (f1, f2), y in zip(pairs, labels):
-    X1.append(load_image(os.path.join("fingerprint_data", f1)))
-    X2.append(load_image(os.path.join("fingerprint_data", f2)))
-    Y.append(y)
+# whole people are held out, so none of their fingers are seen in
+# training; validation needs at least two fingers to draw impostors from
+n_val = max(1, int(len(persons) * VALIDATION_SPLIT))
+val_fingers = set()
+for count, person in enumerate(persons, 1):
+    val_fingers |= {finger for finger in groups if finger.split("_")[0] == person}
+    if count >= n_val and len(val_fingers) >= 2:
+        break
 
-X1 = np.array(X1)
-X2 = np.array(X2)
-Y = np.array(Y)
+train_groups = {f: i for f, i in groups.items() if f not in val_fingers}
+val_groups = {f: i for f, i in groups.items() if f in val_fingers}
 
 model.fit(
-    [X1, X2], Y,
-    batch_size=8,
-    epochs=15,
-    validation_split=0.2
+    pair_dataset(images, train_groups, NEGATIVES_PER_EPOCH, shuffle=True),
+    validation_data=pair_dataset(images, val_groups, 0, shuffle=False),
+    epochs=EPOCHS
 )
 
 model.save("fingerprint_verifier.keras")
 
+# the shared tower on its own, so enrolled prints can be embedded once
+base_cnn.save("fingerprint_embedder.keras")
+
+# TFLite copy of the tower plus the head weights, which verify.py prefers
+# over Keras; FINGERPRINT_QUANTIZATION=dynamic|float16|int8 shrinks it.
+# Check it with `python fingerprint_export.py compare`.
+head_weights, head_bias = model.layers[-1].get_weights()
+export_head(head_weights, head_bias[0], HEAD_PATH)
+export_tflite(base_cnn, TFLITE_PATH,
+              os.getenv("FINGERPRINT_QUANTIZATION") or None, paths)
+
 model = load_model(
     "fingerprint_verifier.keras",
     custom_objects={"L1Distance": L1Distance},
@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+from queue import Queue, Empty
+from concurrent.futures import Future
+
+import numpy as np
+
+import verify
+from metrics import inference_seconds, inference_batch_size
+
+# ===================== SETTINGS =====================
+MAX_BATCH = int(os.getenv("VERIFY_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("VERIFY_MAX_WAIT_MS", "5"))
+
+# ===================== BATCH VERIFIER =====================
+
+
+class BatchVerifier:
+    """Collects concurrent verification requests and embeds their query
+    prints with one model call per micro-batch."""
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="batch-verifier", daemon=True)
+                self._thread.start()
+
+    def submit(self, enrolled_embedding, query_image) -> Future:
+        """Queue one (enrolled embedding, preprocessed query image) pair.
+        The future resolves to the similarity score."""
+        return self._put(enrolled_embedding, query_image)
+
+    def embed(self, query_image) -> Future:
+        """Queue a query image on its own. The future resolves to its
+        embedding."""
+        return self._put(None, query_image)
+
+    def _put(self, enrolled_embedding, query_image):
+        future = Future()
+        self.queue.put((enrolled_embedding, query_image, future))
+        self._ensure_running()
+        return future
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # a running future can't be cancelled under us any more;
+            # those already cancelled (the caller went away) are dropped
+            batch = [item for item in self._collect()
+                     if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            enrolled, images, futures = zip(*batch)
+
+            try:
+                started = time.perf_counter()
+                queries = verify.embed_batch(np.stack(images))
+                inference_seconds.observe(time.perf_counter() - started)
+                inference_batch_size.observe(len(images))
+                scored = [i for i, e in enumerate(enrolled) if e is not None]
+                scores = verify.similarities(
+                    np.stack([enrolled[i] for i in scored]),
+                    queries[scored]
+                ) if scored else []
+            except Exception as exc:
+                for future in futures:
+                    future.set_exception(exc)
+                continue
+
+            for i, score in zip(scored, scores):
+                futures[i].set_result(float(score))
+            for i, future in enumerate(futures):
+                if enrolled[i] is None:
+                    future.set_result(queries[i])
+
+
+batch_verifier = BatchVerifier()
@@ -1,58 +1,208 @@
+import os
+import time
+import threading
 import numpy as np
-import cv2
-from PIL import Image
-import tensorflow as tf
-from tensorflow.keras import layers
-from tensorflow.keras.models import load_model
 
+from fingerprint_preprocess import IMG_SIZE, load_image
+from structured_logging import get_logger
 
-IMG_SIZE = 224
+logger = get_logger("verify")
 
 
-class L1Distance(layers.Layer):
-    def call(self, inputs):
-        x, y = inputs
-        return tf.abs(x - y)
+EMBEDDING_DIM = 128
 
+MODEL_PATH = "fingerprint_verifier.keras"
+EMBEDDER_PATH = "fingerprint_embedder.keras"
+# written by train_siamese.py / fingerprint_export.py: the embedding tower
+# as a TFLite model and the siamese head weights, so verification can run
+# without importing TensorFlow
+TFLITE_PATH = os.getenv("FINGERPRINT_TFLITE_PATH", "fingerprint_embedder.tflite")
+HEAD_PATH = "fingerprint_head.npz"
+# "keras", "tflite", or "auto" (tflite when its files exist)
+RUNTIME = os.getenv("FINGERPRINT_RUNTIME", "auto")
 
-def load_image(path):
-    img = Image.open(path).convert("L")
-    img = np.array(img)
 
-    # normalize 16-bit TIFF
-    if img.dtype != np.uint8:
-        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
-        img = img.astype(np.uint8)
+# TensorFlow and the models are only imported on first use, so importing
+# this module (e.g. from main.py) stays cheap
 
-    img = cv2.resize(img, (IMG_SIZE, IMG_SIZE))
-    img = img / 255.0
-    img = np.expand_dims(img, axis=-1)
-    return img
+model = None
+embedder = None
+head_weights = None
+head_bias = None
+runtime = None
+load_seconds = None
 
+_load_lock = threading.Lock()
 
-model = load_model(
-    "fingerprint_verifier.keras",
-    custom_objects={"L1Distance": L1Distance},
-    compile=False
-)
 
+def model_status() -> dict:
+    return {"loaded": embedder is not None, "runtime": runtime,
+            "load_seconds": load_seconds}
 
-def verify(enrolled_path, query_path, threshold=0.5) -> bool:
-    img1 = load_image(enrolled_path)
-    img2 = load_image(query_path)
 
-    score = model.predict(
-        [np.expand_dims(img1, 0), np.expand_dims(img2, 0)],
-        verbose=0
-    )[0][0]
+def load_keras_models():
+    """(siamese model, embedding tower, head weights, head bias)."""
+    import tensorflow as tf
+    from tensorflow.keras import layers
+    from tensorflow.keras.models import load_model
 
-    print("Similarity score:", score)
+    class L1Distance(layers.Layer):
+        def call(self, inputs):
+            x, y = inputs
+            return tf.abs(x - y)
 
-    if score >= threshold:
-        return True
+    siamese = load_model(
+        MODEL_PATH,
+        custom_objects={"L1Distance": L1Distance},
+        compile=False
+    )
+
+    if os.path.exists(EMBEDDER_PATH):
+        tower = load_model(EMBEDDER_PATH, compile=False)
     else:
-        return False
+        # older checkpoints only ship the siamese model, reuse its
+        # shared tower
+        tower = next(
+            (layer for layer in siamese.layers
+             if isinstance(layer, tf.keras.Model)), None)
+        if tower is None:
+            raise RuntimeError(f"No embedding tower found in {MODEL_PATH}")
+
+    # the siamese head is L1Distance -> Dense(1, sigmoid); keep its
+    # weights so cached embeddings can be scored without running the
+    # CNN again
+    head = [layer for layer in siamese.layers
+            if isinstance(layer, layers.Dense)][-1]
+    weights, bias = head.get_weights()
+
+    return siamese, tower, weights[:, 0].astype(np.float32), float(bias[0])
+
+
+def load_head(path=HEAD_PATH):
+    with np.load(path) as head:
+        return head["weights"].astype(np.float32), float(head["bias"])
+
+
+class TFLiteEmbedder:
+    """predict_on_batch() over a TFLite model, with the lightest
+    interpreter that is installed."""
+
+    def __init__(self, path):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(
+            model_path=path, num_threads=os.cpu_count())
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+        # one interpreter, so one call at a time
+        self._lock = threading.Lock()
+
+    def predict_on_batch(self, images):
+        images = np.asarray(images, dtype=np.float32)
+
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32 and scale:
+            images = np.round(images / scale + zero_point).astype(self.input["dtype"])
+
+        with self._lock:
+            if len(images) != self.batch_size:
+                self.interpreter.resize_tensor_input(
+                    self.input["index"], images.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(images)
+
+            self.interpreter.set_tensor(self.input["index"], images)
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self.output["index"])
+
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32 and scale:
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out
+
+
+def use_tflite() -> bool:
+    if RUNTIME == "auto":
+        return os.path.exists(TFLITE_PATH) and os.path.exists(HEAD_PATH)
+    return RUNTIME == "tflite"
+
+
+def load_models():
+    global model, embedder, head_weights, head_bias, runtime, load_seconds
+
+    if embedder is not None:
+        return
+
+    with _load_lock:
+        if embedder is not None:
+            return
+
+        started = time.perf_counter()
+
+        if use_tflite():
+            tower = TFLiteEmbedder(TFLITE_PATH)
+            weights, bias = load_head()
+            runtime = "tflite"
+        else:
+            model, tower, weights, bias = load_keras_models()
+            runtime = "keras"
+
+        head_weights = weights
+        head_bias = bias
+        load_seconds = time.perf_counter() - started
+        embedder = tower
+
+        logger.info("fingerprint model loaded",
+                    extra={"runtime": runtime, "load_seconds": round(load_seconds, 3)})
+
+
+def warm_up():
+    load_models()
+    # the first call traces the graph, do it before real traffic arrives
+    embed_batch(np.zeros((1, IMG_SIZE, IMG_SIZE, 1), dtype=np.float32))
+
+
+def embed_batch(images) -> np.ndarray:
+    load_models()
+    embeddings = embedder.predict_on_batch(np.asarray(images))
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def embed(source) -> np.ndarray:
+    """Embedding of one print, given as a path or as encoded bytes."""
+    img = load_image(source)
+    return embed_batch(np.expand_dims(img, 0))[0]
+
+
+def similarities(enrolled_embeddings, query_embeddings) -> np.ndarray:
+    load_models()
+    distance = np.abs(enrolled_embeddings - query_embeddings)
+    logits = distance @ head_weights + head_bias
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+def similarity(enrolled_embedding, query_embedding) -> float:
+    return float(similarities(enrolled_embedding, query_embedding))
+
+
+def verify_embedding(enrolled_embedding, query, threshold=0.5) -> bool:
+    score = similarity(enrolled_embedding, embed(query))
+    logger.debug("similarity", extra={"score": score})
+    return score >= threshold
+
+
+def verify(enrolled, query, threshold=0.5) -> bool:
+    return verify_embedding(embed(enrolled), query, threshold)
 
 
 if __name__ == "__main__":
-    verify("fingerprint_data/012_3_1.tif", "fingerprint_data/012_4_8.tif")
+    print("Similarity score:", similarity(
+        embed("fingerprint_data/012_3_1.tif"), embed("fingerprint_data/012_4_8.tif")))